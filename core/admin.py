@@ -1,10 +1,20 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import Count
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from . import images, tasks
+from .bulk_upload import save_gallery_upload
+from .forms import GalleryBulkUploadForm
 from .models import (
     Segment, Member, Achievement, GalleryPhoto, Event,
     ContactSubmission, Newsletter, BlogPost, FAQ, Project, 
-    Resource, MembershipApplication
+    Resource, MembershipApplication, Task
 )
 
 
@@ -34,13 +44,17 @@ class SegmentAdmin(admin.ModelAdmin):
 
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;"/>', obj.photo.url)
+            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;"/>', images.thumbnail_url(obj.photo, 'admin'))
         return "No photo"
     photo_preview.short_description = "Photo"
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_member_count=Count('members'))
+
     def member_count(self, obj):
-        return obj.members.count()
+        return obj._member_count
     member_count.short_description = "Members"
+    member_count.admin_order_field = '_member_count'
 
 
 @admin.register(Member)
@@ -67,9 +81,12 @@ class MemberAdmin(admin.ModelAdmin):
         }),
     ]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('segment')
+
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 50%;"/>', obj.photo.url)
+            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 50%;"/>', images.thumbnail_url(obj.photo, 'admin'))
         return "No photo"
     photo_preview.short_description = "Photo"
 
@@ -97,7 +114,7 @@ class AchievementAdmin(admin.ModelAdmin):
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', images.thumbnail_url(obj.image, 'admin'))
         return "No image"
     image_preview.short_description = "Image"
 
@@ -107,7 +124,7 @@ class GalleryPhotoAdmin(admin.ModelAdmin):
     list_display = ['caption_short', 'category', 'image_preview', 'uploaded_at']
     list_filter = ['category', 'uploaded_at']
     search_fields = ['caption']
-    readonly_fields = ['uploaded_at']
+    readonly_fields = ['uploaded_at', 'updated_at']
     
     def caption_short(self, obj):
         return obj.caption[:50] + "..." if len(obj.caption) > 50 else obj.caption
@@ -115,10 +132,51 @@ class GalleryPhotoAdmin(admin.ModelAdmin):
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', images.thumbnail_url(obj.image, 'admin'))
         return "No image"
     image_preview.short_description = "Photo"
 
+    def get_urls(self):
+        # csrf_exempt only lets the upload handlers be swapped before the body
+        # is read; bulk_upload_view applies csrf_protect itself
+        view = self.admin_site.admin_view(csrf_exempt(self.bulk_upload_view))
+        return [
+            path('bulk-upload/', view, name='core_galleryphoto_bulk_upload'),
+            *super().get_urls(),
+        ]
+
+    def bulk_upload_view(self, request):
+        # Spool every upload to a temporary file rather than memory
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return csrf_protect(self._bulk_upload_view)(request)
+
+    def _bulk_upload_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = GalleryBulkUploadForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            photos, skipped, queued = save_gallery_upload(
+                form.cleaned_data['files'], form.cleaned_data['caption'], form.cleaned_data['category'],
+            )
+            if queued is not None:
+                self.message_user(request, format_html(
+                    'Uploaded {} photos. Thumbnails are being generated in the background (<a href="{}">progress</a>).',
+                    len(photos), reverse('admin:core_task_change', args=[queued.pk]),
+                ))
+            if skipped:
+                self.message_user(
+                    request, f"Skipped {len(skipped)} files that are not images: {', '.join(skipped[:10])}",
+                    level=messages.WARNING,
+                )
+            return redirect('admin:core_galleryphoto_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Bulk upload gallery photos',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/core/galleryphoto/bulk_upload.html', context)
+
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -143,7 +201,7 @@ class EventAdmin(admin.ModelAdmin):
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', images.thumbnail_url(obj.image, 'admin'))
         return "No image"
     image_preview.short_description = "Image"
 
@@ -212,6 +270,9 @@ class BlogPostAdmin(admin.ModelAdmin):
         }),
     ]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author')
+
     def save_model(self, request, obj, form, change):
         if not obj.author_id:
             obj.author = request.user
@@ -274,9 +335,12 @@ class ProjectAdmin(admin.ModelAdmin):
         }),
     ]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('segment')
+
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="width: 60px; height: 40px; object-fit: cover; border-radius: 3px;"/>', images.thumbnail_url(obj.image, 'admin'))
         return "No image"
     image_preview.short_description = "Image"
 
@@ -333,8 +397,38 @@ class MembershipApplicationAdmin(admin.ModelAdmin):
         }),
     ]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('interested_segment')
+
     def save_model(self, request, obj, form, change):
         if 'status' in form.changed_data and obj.status != 'pending':
             obj.reviewed_by = request.user
             obj.reviewed_at = timezone.now()
         super().save_model(request, obj, form, change)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'status', 'progress_bar', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['status', 'name']
+    search_fields = ['key']
+    readonly_fields = [
+        'name', 'args', 'key', 'status', 'attempts', 'max_attempts', 'progress', 'progress_message',
+        'last_error', 'run_after', 'started_at', 'finished_at', 'created_at', 'updated_at',
+    ]
+    actions = ['retry_tasks']
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress_bar(self, obj):
+        return format_html(
+            '<progress max="100" value="{}" title="{}"></progress> {}%',
+            obj.progress, obj.progress_message, obj.progress,
+        )
+    progress_bar.short_description = "Progress"
+
+    @admin.action(description="Retry selected failed tasks")
+    def retry_tasks(self, request, queryset):
+        count = tasks.retry(queryset)
+        self.message_user(request, f"{count} task(s) queued again.")
@@ -0,0 +1,34 @@
+"""
+``core.urls`` with the async views of ``core.async_views`` swapped in.
+
+Every other URL, and every cache policy, is shared with ``core.urls``.
+"""
+from django.urls.resolvers import URLPattern
+
+from . import async_views
+from .cache_policy import apply_cache_policies
+from .urls import CACHE_POLICIES, app_name, urlpatterns as sync_urlpatterns  # noqa: F401
+
+
+ASYNC_VIEWS = {
+    'home': async_views.home_view,
+    'faq': async_views.faq_view,
+    'search': async_views.search_view,
+    'segments': async_views.SegmentListView.as_view(),
+    'members': async_views.MemberListView.as_view(),
+    'achievements': async_views.AchievementListView.as_view(),
+    'gallery': async_views.GalleryListView.as_view(),
+    'events': async_views.EventListView.as_view(),
+    'blog': async_views.BlogListView.as_view(),
+    'projects': async_views.ProjectListView.as_view(),
+    'resources': async_views.ResourceListView.as_view(),
+}
+
+urlpatterns = apply_cache_policies(
+    [
+        URLPattern(pattern.pattern, ASYNC_VIEWS[pattern.name], pattern.default_args, pattern.name)
+        if pattern.name in ASYNC_VIEWS else pattern
+        for pattern in sync_urlpatterns
+    ],
+    {name: CACHE_POLICIES[name] for name in ASYNC_VIEWS},
+)
@@ -0,0 +1,145 @@
+"""
+Async variants of the read-only public views.
+
+They render the same templates and send the same validators as their
+counterparts in ``core.views``, but read through Django's async ORM and issue
+independent queries together with ``asyncio.gather`` (the four homepage
+lists, the per-model search lookups, the FAQ entries and categories). Under
+ASGI a request waiting on the database then no longer holds a worker thread.
+
+``core.async_urls`` swaps them in for the sync views; point ``ROOT_URLCONF``
+at ``ncc_website.async_urls`` to serve them. ``manage.py loadtest_asgi``
+compares the two URLconfs.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.shortcuts import render
+
+from . import search, views
+from .conditional import aaudience, make_etag, not_modified_response, set_validators
+from .forms import SearchForm
+from .models import FAQ
+from .snapshots import aget_home_snapshot
+
+
+# Templates may touch request.user and lazy querysets, so they render in a worker thread
+arender = sync_to_async(render)
+
+
+async def home_view(request):
+    """Homepage, served from the precomputed snapshot"""
+    html, context = await aget_home_snapshot(request)
+    user = await request.auser()
+    if user.is_staff:
+        return await arender(request, 'core/home.html', context)
+    return HttpResponse(html)
+
+
+async def faq_view(request):
+    """FAQ page"""
+    faqs = FAQ.objects.filter(is_active=True).order_by('order', 'question')
+    stats = await faqs.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    etag = make_etag('faq', await aaudience(request), stats['last_modified'], stats['count'])
+    response = not_modified_response(request, etag)
+    if response is not None:
+        return response
+
+    async def evaluate(queryset):
+        return [item async for item in queryset]
+
+    faqs, categories = await asyncio.gather(
+        evaluate(faqs),
+        evaluate(faqs.values_list('category', flat=True).distinct()),
+    )
+    context = {
+        'faqs': faqs,
+        'categories': categories,
+        'page_title': 'FAQ - NITER Computer Club'
+    }
+    return set_validators(await arender(request, 'core/faq.html', context), etag)
+
+
+async def search_view(request):
+    """Global search across all content"""
+    form = SearchForm(request.GET or None)
+    results = {}
+    query = ''
+    category = 'all'
+
+    if form.is_valid():
+        query = form.cleaned_data['query']
+        category = form.cleaned_data['category'] or 'all'
+        results = await search.asearch(query, category)
+
+    total_results = sum(len(result_list) for result_list in results.values())
+
+    context = {
+        'form': form,
+        'results': results,
+        'total_results': total_results,
+        'query': query,
+        'category': category,
+        'page_title': f'Search: {query}' if query else 'Search - NITER Computer Club'
+    }
+    return await arender(request, 'core/search.html', context)
+
+
+class AsyncListMixin:
+    """
+    Async ``get`` for the list views in ``core.views``.
+
+    The validators and the page of objects are fetched with the async ORM;
+    ``get_context_data`` then runs unchanged on the prefetched page, and any
+    other querysets it adds stay lazy until the template renders.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        etag, last_modified = await self.aget_list_validators()
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        self.object_list = self.get_queryset()
+        page_size = self.get_paginate_by(self.object_list)
+        self._async_page = None
+        if page_size:
+            self._async_page = await self.apaginate_queryset(self.object_list, page_size)
+        response = self.render_to_response(self.get_context_data())
+        return set_validators(response, etag, last_modified)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self._async_page
+
+
+class SegmentListView(AsyncListMixin, views.SegmentListView):
+    pass
+
+
+class MemberListView(AsyncListMixin, views.MemberListView):
+    pass
+
+
+class AchievementListView(AsyncListMixin, views.AchievementListView):
+    pass
+
+
+class GalleryListView(AsyncListMixin, views.GalleryListView):
+    pass
+
+
+class EventListView(AsyncListMixin, views.EventListView):
+    pass
+
+
+class BlogListView(AsyncListMixin, views.BlogListView):
+    pass
+
+
+class ProjectListView(AsyncListMixin, views.ProjectListView):
+    pass
+
+
+class ResourceListView(AsyncListMixin, views.ResourceListView):
+    pass
@@ -0,0 +1,99 @@
+"""
+Bulk gallery uploads.
+
+``GalleryPhotoAdmin`` accepts many images at once, as separate files and/or
+ZIP archives. The request only moves bytes: uploads are spooled to temporary
+files by Django, ZIP members are streamed out one chunk at a time, and every
+file is saved straight to storage before the rows are created with a single
+``bulk_create``. Decoding and resizing happen afterwards in one
+``images.process_batch`` task, which spreads the images over a process pool.
+"""
+import posixpath
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, UnidentifiedImageError
+
+from .cache_policy import purge_surrogate_keys
+from .models import GalleryPhoto
+from .tasks import enqueue
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+def is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _zip_members(archive):
+    """Yield ``(filename, file)`` for each image in an uploaded ZIP"""
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            filename = posixpath.basename(info.filename)
+            if info.is_dir() or filename.startswith('.') or '__MACOSX/' in info.filename:
+                continue
+            if not is_image_name(filename) or info.file_size > settings.GALLERY_UPLOAD_MAX_FILE_SIZE:
+                yield filename, None
+                continue
+            with zf.open(info) as member:
+                content = File(member, name=filename)
+                content.size = info.file_size
+                yield filename, content
+
+
+def iter_uploaded_images(uploads):
+    """
+    Yield ``(filename, file)`` for every image in ``uploads``, expanding ZIP
+    archives. ``file`` is None for entries that are not usable images.
+    """
+    for upload in uploads:
+        if upload.name.lower().endswith('.zip'):
+            yield from _zip_members(upload)
+        elif is_image_name(upload.name) and upload.size <= settings.GALLERY_UPLOAD_MAX_FILE_SIZE:
+            yield upload.name, upload
+        else:
+            yield upload.name, None
+
+
+def _is_readable_image(content):
+    """Check the image header only; the pixels are decoded later, off the request"""
+    try:
+        Image.open(content)  # not closed: that would close ``content`` too
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        # A bomb's header claims more pixels than a worker may decode
+        return False
+    finally:
+        content.seek(0)
+    return True
+
+
+def save_gallery_upload(uploads, caption='', category='general'):
+    """
+    Store every image in ``uploads`` and create a ``GalleryPhoto`` for each.
+
+    Photos are captioned ``caption``, or their file name without extension.
+    Returns ``(photos, skipped_names, task)``.
+    """
+    field = GalleryPhoto._meta.get_field('image')
+    photos = []
+    skipped = []
+    for filename, content in iter_uploaded_images(uploads):
+        if content is None or not _is_readable_image(content):
+            skipped.append(filename)
+            continue
+        name = field.storage.save(field.generate_filename(None, filename), content)
+        photos.append(GalleryPhoto(
+            image=name,
+            caption=caption or posixpath.splitext(filename)[0][:500],
+            category=category,
+        ))
+
+    queued = None
+    if photos:
+        photos = GalleryPhoto.objects.bulk_create(photos, batch_size=100)
+        # bulk_create sends no post_save, so do what its receivers would
+        purge_surrogate_keys('galleryphoto:list')
+        queued = enqueue('images.process_batch', GalleryPhoto._meta.label_lower, [photo.pk for photo in photos])
+    return photos, skipped, queued
@@ -0,0 +1,216 @@
+"""
+Two-tier cache backend.
+
+``TieredCache`` keeps a bounded, per-process LRU in front of a file-based
+store shared by every worker on the machine. Neither tier needs an external
+service or touches the database, so page-cache hits from
+``FetchFromCacheMiddleware`` no longer compete with content writes for the
+SQLite lock. Point ``LOCATION`` at a tmpfs such as ``/dev/shm`` to keep the
+shared tier in memory as well.
+
+Entries are only trusted in the local tier for ``LOCAL_TIMEOUT`` seconds, which
+bounds how long a process can serve a value that another process has since
+replaced or deleted. ``add`` and ``incr`` always go to the shared tier and
+hold an exclusive lock on ``LOCATION/tiered.lock`` while they read and write,
+so they are atomic across processes.
+
+Example::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.TieredCache',
+            'LOCATION': '/dev/shm/ncc-cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,        # shared tier
+                'LOCAL_MAX_ENTRIES': 500,   # per-process tier
+                'LOCAL_TIMEOUT': 5,
+            },
+        }
+    }
+"""
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+
+def _identity_key(key, key_prefix, version):
+    # Keys are already prefixed and versioned by the TieredCache in front.
+    return key
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 500))
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self._local = OrderedDict()
+        self._local_expiry = {}
+        self._lock = threading.Lock()
+        self._shared = FileBasedCache(location, {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'KEY_FUNCTION': _identity_key,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('MAX_ENTRIES', 300),
+                'CULL_FREQUENCY': options.get('CULL_FREQUENCY', 3),
+            },
+        })
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'sets': 0}
+
+    # Local tier ---------------------------------------------------------
+
+    def _local_get(self, key):
+        with self._lock:
+            expiry = self._local_expiry.get(key)
+            if expiry is None:
+                return None
+            if expiry <= time.time():
+                self._local_delete(key)
+                return None
+            self._local.move_to_end(key)
+            return self._local[key]
+
+    def _local_set(self, key, pickled, timeout):
+        expiry = time.time() + self._local_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            expiry = min(expiry, backend_timeout)
+        with self._lock:
+            self._local[key] = pickled
+            self._local.move_to_end(key)
+            self._local_expiry[key] = expiry
+            while len(self._local) > self._local_max_entries:
+                oldest, _ = self._local.popitem(last=False)
+                self._local_expiry.pop(oldest, None)
+
+    def _local_delete(self, key):
+        self._local.pop(key, None)
+        self._local_expiry.pop(key, None)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # Cache API ----------------------------------------------------------
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._shared_lock():
+            if self._shared.has_key(key):
+                return False
+            self._shared.set(key, value, self.get_timeout(timeout))
+        self._local_set(key, pickle.dumps(value, self.pickle_protocol), timeout)
+        self._count('sets')
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = self._local_get(key)
+        if pickled is not None:
+            self._count('local_hits')
+            return pickle.loads(pickled)
+
+        sentinel = object()
+        value = self._shared.get(key, sentinel)
+        if value is sentinel:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local_set(key, pickle.dumps(value, self.pickle_protocol), DEFAULT_TIMEOUT)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._shared.set(key, value, self.get_timeout(timeout))
+        self._local_set(key, pickle.dumps(value, self.pickle_protocol), timeout)
+        self._count('sets')
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._shared.touch(key, self.get_timeout(timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            self._local_delete(key)
+        return self._shared.delete(key)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self._local_get(key) is not None:
+            return True
+        return self._shared.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Always read the shared tier: another process may have incremented
+        with self._shared_lock():
+            value, expiry = self._shared_get_with_expiry(key)
+            new_value = value + delta
+            timeout = None if expiry is None else expiry - time.time()
+            self._shared.set(key, new_value, timeout)
+        self._local_set(key, pickle.dumps(new_value, self.pickle_protocol), timeout)
+        return new_value
+
+    def _shared_get_with_expiry(self, key):
+        """``(value, expiry)`` of ``key`` in the shared tier; ValueError if it is missing"""
+        try:
+            with open(self._shared._key_to_file(key), 'rb') as f:
+                expiry = pickle.load(f)
+                if expiry is None or expiry > time.time():
+                    return pickle.loads(zlib.decompress(f.read())), expiry
+        except FileNotFoundError:
+            pass
+        raise ValueError("Key '%s' not found" % key)
+
+    @contextmanager
+    def _shared_lock(self):
+        """Exclusive lock serializing read-modify-write operations across processes"""
+        self._shared._createdir()
+        with open(os.path.join(self._shared._dir, 'tiered.lock'), 'ab') as lockfile:
+            locks.lock(lockfile, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lockfile)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._local_expiry.clear()
+        self._shared.clear()
+
+    def get_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """Relative timeout to hand to the shared tier"""
+        if timeout == DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
+
+    # Instrumentation ----------------------------------------------------
+
+    @property
+    def stats(self):
+        """Hit/miss counters for this process since start-up (or ``reset_stats``)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_entries'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (
+            (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
@@ -0,0 +1,222 @@
+"""
+Per-view page caching.
+
+Each public URL declares a ``CachePolicy`` in the ``CACHE_POLICIES`` registry
+of ``core/urls.py``; ``apply_cache_policies`` wraps the matching views. A
+policy gives the page's lifetime, which request headers it varies on and the
+surrogate keys (``event:list``, ``blogpost:12``) describing what it rendered.
+Views add object-level keys at request time with ``add_surrogate_keys``,
+before reading the object.
+
+Each stored page remembers the version of every surrogate key it was tagged
+with. ``purge_surrogate_keys`` (called from ``core.signals`` whenever a core
+model is saved or deleted) bumps those versions, and a page whose tags have
+moved on is treated as a miss and re-rendered. This purges exactly the pages
+showing the changed content, so pages can be cached for a long time.
+
+Purges only reach this cache. Shared caches in front of the site (a CDN or
+proxy) are told ``s-maxage=PAGE_SHARED_CACHE_MAX_AGE``, a short lifetime that
+bounds how long they can serve a page after its content changed; the long
+``timeout`` stays private to this cache.
+
+Only anonymous ``GET``/``HEAD`` requests are served from or stored in the
+cache, so the cache key does not need to vary on ``Cookie``. A response is
+never stored if it used a CSRF token, set a cookie, marked itself private
+or is not a 200. Form pages use ``NEVER_CACHE`` instead, which also tells
+browsers and proxies not to keep a copy. URLs without a policy are left
+untouched. Async views get an async wrapper whose cache I/O runs in a worker
+thread.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import never_cache
+
+
+PAGE_KEY = 'core:page:%s'
+TAG_VERSION_KEY = 'core:page:tag:%s'
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+CACHE_STATUS_HEADER = 'X-Page-Cache'
+
+
+def add_surrogate_keys(request, *keys):
+    """
+    Tag the page being rendered for ``request`` with ``keys``.
+
+    Their versions are read now, so call it before reading the content they
+    name: a save committed in between then purges the page being stored.
+    """
+    request.surrogate_keys = getattr(request, 'surrogate_keys', ()) + keys
+    request.surrogate_key_versions = {
+        **tag_versions(keys), **getattr(request, 'surrogate_key_versions', {}),
+    }
+
+
+def tag_versions(keys):
+    """Return ``{key: version}`` for surrogate ``keys``, starting missing ones"""
+    cache_keys = {TAG_VERSION_KEY % key: key for key in keys}
+    versions = cache.get_many(cache_keys)
+    for cache_key in cache_keys.keys() - versions.keys():
+        # A fresh, unique start so an evicted tag cannot revive older pages
+        cache.add(cache_key, time.time_ns(), None)
+        versions[cache_key] = cache.get(cache_key)
+    return {cache_keys[cache_key]: version for cache_key, version in versions.items()}
+
+
+def purge_surrogate_keys(*keys):
+    """Invalidate every cached page tagged with any of ``keys``"""
+    for key in keys:
+        try:
+            cache.incr(TAG_VERSION_KEY % key)
+        except ValueError:
+            pass  # no page was tagged with it (or the tag was evicted)
+
+
+def model_surrogate_keys(instance):
+    """The keys purged when ``instance`` changes: ``<model>:<pk>`` and ``<model>:list``"""
+    model_name = instance._meta.model_name
+    return (f'{model_name}:{instance.pk}', f'{model_name}:list')
+
+
+class CachePolicy:
+    """How one view's responses are cached"""
+
+    def __init__(self, timeout=None, vary=(), anonymous_only=True,
+                 surrogate_keys=(), max_age=0, bypass=False):
+        self._timeout = timeout
+        self.vary = tuple(vary)
+        self.anonymous_only = anonymous_only
+        self.surrogate_keys = tuple(surrogate_keys)
+        # Browsers revalidate (cheaply, with the ETag) after max_age seconds
+        self.max_age = max_age
+        self.bypass = bypass
+
+    @property
+    def timeout(self):
+        if self._timeout is None:
+            return settings.PAGE_CACHE_TIMEOUT
+        return self._timeout
+
+    def is_cacheable_request(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if 'messages' in request.COOKIES:
+            return False
+        if self.anonymous_only and settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return not request.user.is_authenticated
+        return True
+
+    def is_cacheable_response(self, request, response):
+        if request.method != 'GET' or response.status_code != 200:
+            return False
+        if response.streaming or response.cookies:
+            return False
+        if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            return False  # the page embeds a per-visitor CSRF token
+        cache_control = response.get('Cache-Control', '')
+        return 'private' not in cache_control and 'no-store' not in cache_control
+
+    def cache_key(self, request):
+        parts = [request.get_host(), request.path, request.GET.urlencode()]
+        parts.extend(request.headers.get(header, '') for header in self.vary)
+        digest = hashlib.md5('|'.join(parts).encode(), usedforsecurity=False)
+        return PAGE_KEY % digest.hexdigest()
+
+    def get_surrogate_keys(self, request):
+        keys = self.surrogate_keys + getattr(request, 'surrogate_keys', ())
+        return tuple(dict.fromkeys(keys))
+
+    def decorate(self, request, response, keys, status):
+        if keys:
+            response[SURROGATE_KEY_HEADER] = ' '.join(keys)
+        response[CACHE_STATUS_HEADER] = status
+        if self.vary:
+            patch_vary_headers(response, self.vary)
+        s_maxage = min(self.timeout, settings.PAGE_SHARED_CACHE_MAX_AGE)
+        patch_cache_control(response, public=True, max_age=min(self.max_age, s_maxage), s_maxage=s_maxage)
+        return response
+
+    def store(self, request, key, response, versions):
+        if not self.is_cacheable_response(request, response):
+            return
+        keys = self.get_surrogate_keys(request)
+        for tag, version in getattr(request, 'surrogate_key_versions', {}).items():
+            versions.setdefault(tag, version)
+        versions.update(tag_versions([k for k in keys if k not in versions]))
+        self.decorate(request, response, keys, 'miss')
+        cache.set(key, {'response': response, 'keys': keys, 'versions': versions}, self.timeout)
+
+    def fetch(self, request, key):
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        current = cache.get_many([TAG_VERSION_KEY % k for k in entry['keys']])
+        for tag, version in entry['versions'].items():
+            if current.get(TAG_VERSION_KEY % tag) != version:
+                return None  # purged since it was stored
+        return self.decorate(request, entry['response'], entry['keys'], 'hit')
+
+    def finish(self, request, key, response, versions):
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.add_post_render_callback(lambda r: self.store(request, key, r, versions))
+        else:
+            self.store(request, key, response, versions)
+        return response
+
+    def wrap(self, view):
+        if self.bypass:
+            return never_cache(view)
+        if iscoroutinefunction(view):
+            return self.wrap_async(view)
+
+        @wraps(view)
+        def cached_view(request, *args, **kwargs):
+            if not self.is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+            key = self.cache_key(request)
+            response = self.fetch(request, key)
+            if response is not None:
+                return response
+            versions = tag_versions(self.surrogate_keys)
+            response = view(request, *args, **kwargs)
+            return self.finish(request, key, response, versions)
+        return cached_view
+
+    def wrap_async(self, view):
+        @wraps(view)
+        async def cached_view(request, *args, **kwargs):
+            if not await sync_to_async(self.is_cacheable_request)(request):
+                return await view(request, *args, **kwargs)
+            key = self.cache_key(request)
+            response = await sync_to_async(self.fetch)(request, key)
+            if response is not None:
+                return response
+            versions = await sync_to_async(tag_versions)(self.surrogate_keys)
+            response = await view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                # The handler renders in a worker thread, so the callback may block
+                return self.finish(request, key, response, versions)
+            await sync_to_async(self.store)(request, key, response, versions)
+            return response
+        return cached_view
+
+
+NEVER_CACHE = CachePolicy(bypass=True)
+
+
+def apply_cache_policies(urlpatterns, policies):
+    """Wrap the view of every pattern whose name has an entry in ``policies``"""
+    names = {pattern.name for pattern in urlpatterns}
+    unknown = set(policies) - names
+    if unknown:
+        raise ValueError(f'Cache policies for unknown URL names: {", ".join(sorted(unknown))}')
+    for pattern in urlpatterns:
+        policy = policies.get(pattern.name)
+        if policy is not None:
+            pattern.callback = policy.wrap(pattern.callback)
+    return urlpatterns
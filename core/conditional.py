@@ -0,0 +1,95 @@
+"""
+Conditional GET support.
+
+The public pages derive ``ETag``/``Last-Modified`` validators from the
+``updated_at`` timestamps of the content they render, and answer a matching
+``If-None-Match``/``If-Modified-Since`` with 304 before any template is
+rendered:
+
+* list views (``ConditionalListMixin``) use ``MAX(updated_at)`` and the row
+  count of the filtered queryset, fetched in one aggregate query, plus the
+  ``core.related`` version of each model in ``validator_models``, for the
+  related rows they render (a member's segment, a post's author);
+* detail views (``core.views.ContentDetailView``) use the object's own
+  ``updated_at``.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .related import related_version
+
+
+def make_etag(*parts):
+    """Strong ETag from the string form of ``parts``"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Add ``ETag``/``Last-Modified`` headers unless the view set its own"""
+    if etag and not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """Return a 304 (or 412) response if the request's validators match, else None"""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def audience(request):
+    """Staff see extra links in base.html, so they get their own validators"""
+    return 'staff' if request.user.is_staff else 'public'
+
+
+async def aaudience(request):
+    user = await request.auser()
+    return 'staff' if user.is_staff else 'public'
+
+
+class ConditionalListMixin:
+    """
+    Conditional GET for ``ListView`` subclasses.
+
+    The ETag covers the view, its query string, the newest
+    ``last_modified_field``, the row count (so deletions change it too) and
+    the versions of ``validator_models``.
+    """
+    last_modified_field = 'updated_at'
+    validator_models = ()
+
+    def get_validator_aggregates(self):
+        return {'last_modified': Max(self.last_modified_field), 'count': Count('pk')}
+
+    def build_list_validators(self, stats, audience):
+        etag = make_etag(
+            type(self).__name__, self.request.GET.urlencode(), audience,
+            stats['last_modified'], stats['count'],
+            *[related_version(model) for model in self.validator_models],
+        )
+        return etag, stats['last_modified']
+
+    def get_list_validators(self):
+        stats = self.get_queryset().order_by().aggregate(**self.get_validator_aggregates())
+        return self.build_list_validators(stats, audience(self.request))
+
+    async def aget_list_validators(self):
+        stats = await self.get_queryset().order_by().aaggregate(**self.get_validator_aggregates())
+        return self.build_list_validators(stats, await aaudience(self.request))
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_list_validators()
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
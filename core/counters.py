@@ -0,0 +1,174 @@
+"""
+Buffered download counter for ``Resource.downloads``.
+
+``record_download`` only increments a per-resource counter in the
+``counters`` cache, so serving a download no longer takes SQLite's write
+lock. Pending counts are folded into the database by ``flush_download_counts``
+with a single ``UPDATE ... SET downloads = downloads + CASE ...`` statement
+built from ``F()`` expressions, so concurrent downloads are never lost.
+
+Only resources with pending counts are visited: the first download after a
+flush appends the resource to a journal of numbered cache slots
+(``DIRTY_SLOT_KEY``), and a flush reads the slots written since the last one.
+The ``counters`` cache never culls entries, as a lost counter loses downloads;
+if the journal is lost anyway (the cache was cleared), the next flush visits
+every resource.
+
+A flush that wrote anything purges the cached resource pages and bumps the
+``core.related`` version of ``Resource``, which ``ResourceListView`` puts in
+its ETag, since ``UPDATE`` sends no signals and leaves ``updated_at`` alone.
+
+Flushing happens in a background thread every
+``DOWNLOAD_COUNTER_FLUSH_SECONDS`` seconds (0 disables it) and can be run by
+hand or from cron with ``manage.py flush_download_counts``.
+"""
+import atexit
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils.connection import ConnectionProxy
+
+from .cache_policy import purge_surrogate_keys
+from .models import Resource
+from .related import invalidate_related_items
+
+
+logger = logging.getLogger(__name__)
+
+cache = ConnectionProxy(caches, 'counters')
+
+PENDING_KEY = 'core:downloads:pending:%s'
+FLUSH_LOCK_KEY = 'core:downloads:flush_lock'
+DIRTY_COUNT_KEY = 'core:downloads:dirty'
+DIRTY_FLUSHED_KEY = 'core:downloads:dirty_flushed'
+DIRTY_SLOT_KEY = 'core:downloads:dirty:%d'
+DIRTY_GAP_KEY = 'core:downloads:dirty_gap'
+
+_flusher = {'thread': None}
+_flusher_lock = threading.Lock()
+
+
+def _incr(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _mark_dirty(pk):
+    cache.set(DIRTY_SLOT_KEY % _incr(DIRTY_COUNT_KEY), pk, None)
+
+
+def record_download(pk):
+    """Count one download of Resource ``pk`` without touching the database"""
+    if _incr(PENDING_KEY % pk) == 1:
+        _mark_dirty(pk)  # nothing was pending: this resource needs flushing
+    _ensure_flusher()
+
+
+def pending_downloads(pks):
+    """Return ``{pk: count}`` of increments not yet written to the database"""
+    values = cache.get_many([PENDING_KEY % pk for pk in pks])
+    return {
+        pk: values[PENDING_KEY % pk]
+        for pk in pks
+        if values.get(PENDING_KEY % pk)
+    }
+
+
+def _dirty_slots():
+    """``(pks, slots, last slot read)`` for the resources marked since the last flush"""
+    read = _incr(DIRTY_FLUSHED_KEY, 0)  # incr(0) reads the authoritative value
+    last = _incr(DIRTY_COUNT_KEY, 0)
+    if last < read:
+        # The journal restarted, so marks may be missing: visit every resource
+        logger.warning('Download counter journal was reset; flushing every resource')
+        return set(Resource.objects.values_list('pk', flat=True)), range(1, last + 1), last
+    marked = cache.get_many([DIRTY_SLOT_KEY % slot for slot in range(read + 1, last + 1)])
+    gap = cache.get(DIRTY_GAP_KEY)
+    slots = {}
+    for slot in range(read + 1, last + 1):
+        if DIRTY_SLOT_KEY % slot in marked:
+            slots[slot] = marked[DIRTY_SLOT_KEY % slot]
+        elif slot != gap:
+            # Claimed but not written yet: read it again next time
+            cache.set(DIRTY_GAP_KEY, slot, None)
+            break
+        # else: still empty a flush later, so its writer died; skip it
+        read = slot
+    return set(slots.values()), slots, read
+
+
+def _take(pk):
+    """Atomically read a pending count; the caller must ``decr`` it once saved"""
+    try:
+        # incr(0) reads the authoritative value rather than a local copy
+        return cache.incr(PENDING_KEY % pk, 0)
+    except ValueError:
+        return 0
+
+
+def _invalidate_pages(pks):
+    """Retire cached pages and ETags showing the download counts of ``pks``"""
+    purge_surrogate_keys('resource:list', *[f'resource:{pk}' for pk in pks])
+    invalidate_related_items(Resource)
+
+
+def flush_download_counts():
+    """Write pending download counts to the database; returns the total flushed"""
+    if not cache.add(FLUSH_LOCK_KEY, 1, 60):
+        return 0  # another process is flushing
+    try:
+        pks, slots, read = _dirty_slots()
+        counts = {pk: _take(pk) for pk in pks}
+        counts = {pk: count for pk, count in counts.items() if count}
+        if counts:
+            with transaction.atomic():
+                Resource.objects.filter(pk__in=counts).update(
+                    downloads=F('downloads') + Case(
+                        *[When(pk=pk, then=Value(count)) for pk, count in counts.items()],
+                        default=Value(0),
+                    )
+                )
+                transaction.on_commit(partial(_invalidate_pages, list(counts)))
+        cache.set(DIRTY_FLUSHED_KEY, read, None)
+        cache.delete_many([DIRTY_SLOT_KEY % slot for slot in slots])
+        # Only subtract what was written; increments made meanwhile stay pending
+        for pk, count in counts.items():
+            if cache.decr(PENDING_KEY % pk, count):
+                _mark_dirty(pk)
+        return sum(counts.values())
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+def _flush_periodically(interval, stop):
+    while not stop.wait(interval):
+        try:
+            flush_download_counts()
+        except Exception:
+            logger.exception('Flushing download counts failed')
+
+
+def _ensure_flusher():
+    interval = getattr(settings, 'DOWNLOAD_COUNTER_FLUSH_SECONDS', 10)
+    if not interval or _flusher['thread'] is not None:
+        return
+    with _flusher_lock:
+        if _flusher['thread'] is not None:
+            return
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=_flush_periodically, args=(interval, stop),
+            name='download-counter-flush', daemon=True,
+        )
+        thread.start()
+        _flusher['thread'] = thread
+        atexit.register(stop.set)
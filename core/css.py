@@ -0,0 +1,125 @@
+"""
+Stylesheet build helpers, used by ``manage.py build_css``.
+
+``minify`` strips comments and insignificant whitespace. ``critical_css``
+keeps only the rules of a minified stylesheet whose selectors can match
+some given markup: every class, id and element they name must occur in it.
+Interaction states (``:hover``, ``:focus``...) and at-rules other than
+``@media`` are left out, since none of them affect the first paint.
+
+The markup is scanned as template source, so ``{% if %}``-dependent classes
+count as present.
+"""
+import re
+
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+STRING_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+STRING_PLACEHOLDER = '\x00%d\x00'
+STRING_PLACEHOLDER_RE = re.compile(r'\x00(\d+)\x00')
+# A colon and the next "{", "}" or ";" after it, which tells selectors from declarations
+COLON_RE = re.compile(r'\s*:\s*(?=[^{};]*([{};]|$))')
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+CLASS_ATTR_RE = re.compile(r'\bclass\s*=\s*"([^"]*)"')
+ID_ATTR_RE = re.compile(r'\bid\s*=\s*"([^"]*)"')
+TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+
+SELECTOR_CLASS_RE = re.compile(r'\.([\w-]+)')
+SELECTOR_ID_RE = re.compile(r'#([\w-]+)')
+SELECTOR_TAG_RE = re.compile(r'(?:^|[\s>+~])([a-zA-Z][a-zA-Z0-9]*)')
+INTERACTION_RE = re.compile(r':(?:hover|focus|focus-visible|focus-within|active|visited)\b')
+ALWAYS_CRITICAL = {':root', 'html', 'body', '*'}
+
+
+def _collapse_colon(match):
+    # Followed by "{": a selector or at-rule prelude, where the space in
+    # ".a :first-child" is the descendant combinator
+    if match.group(1) == '{' and match.group(0)[0] == ' ':
+        return ' :'
+    return ':'
+
+
+def minify(css):
+    css = COMMENT_RE.sub('', css)
+    strings = []
+
+    def stash(match):
+        strings.append(match.group(0))
+        return STRING_PLACEHOLDER % (len(strings) - 1)
+
+    css = STRING_RE.sub(stash, css)  # quoted strings are left exactly as written
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = COLON_RE.sub(_collapse_colon, css)
+    css = css.replace(';}', '}')
+    css = STRING_PLACEHOLDER_RE.sub(lambda match: strings[int(match.group(1))], css)
+    return css.strip()
+
+
+def parse_blocks(css):
+    """``(prelude, body)`` for each top-level block of minified ``css``"""
+    blocks = []
+    depth = 0
+    start = body_start = 0
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                body_start = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:body_start], css[body_start + 1:i]))
+                start = i + 1
+    return blocks
+
+
+def used_names(markup):
+    """The ``(classes, ids, tags)`` occurring in template ``markup``"""
+    markup = TEMPLATE_TAG_RE.sub(' ', markup)
+    classes = {name for value in CLASS_ATTR_RE.findall(markup) for name in value.split()}
+    ids = {value.strip() for value in ID_ATTR_RE.findall(markup)}
+    tags = {tag.lower() for tag in TAG_RE.findall(markup)}
+    return classes, ids, tags
+
+
+def is_critical_selector(selector, classes, ids, tags):
+    if selector in ALWAYS_CRITICAL:
+        return True
+    if INTERACTION_RE.search(selector):
+        return False
+    bare = re.sub(r'::?[\w-]+(\([^)]*\))?', '', selector)  # drop pseudo-classes and -elements
+    return (
+        set(SELECTOR_CLASS_RE.findall(bare)) <= classes
+        and set(SELECTOR_ID_RE.findall(bare)) <= ids
+        and {tag.lower() for tag in SELECTOR_TAG_RE.findall(bare)} <= tags
+    )
+
+
+def critical_css(css, markup):
+    """The rules of minified ``css`` needed to render ``markup``"""
+    classes, ids, tags = used_names(markup)
+    return _critical_rules(css, classes, ids, tags)
+
+
+def _critical_rules(css, classes, ids, tags):
+    rules = []
+    for prelude, body in parse_blocks(css):
+        if prelude.startswith('@media'):
+            inner = _critical_rules(body, classes, ids, tags)
+            if inner:
+                rules.append(f'{prelude}{{{inner}}}')
+        elif not prelude.startswith('@'):
+            selectors = [
+                selector for selector in prelude.split(',')
+                if is_critical_selector(selector, classes, ids, tags)
+            ]
+            if selectors:
+                rules.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(rules)
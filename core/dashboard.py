@@ -0,0 +1,54 @@
+"""
+Admin dashboard statistics.
+
+All dashboard counters are computed by a single ``SELECT`` made of one
+``COUNT(*)`` subquery per counter, and the result is cached for
+``DASHBOARD_STATS_TIMEOUT`` seconds so reloading (or auto-refreshing) the
+dashboard does not rescan large tables such as ContactSubmission or
+Newsletter.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import (
+    Segment, Member, Achievement, GalleryPhoto, Event,
+    ContactSubmission, Newsletter, BlogPost, Project,
+    MembershipApplication
+)
+
+
+DASHBOARD_STATS_KEY = 'core:dashboard:stats'
+
+COUNTERS = {
+    'segments_count': lambda: Segment.objects.all(),
+    'members_count': lambda: Member.objects.all(),
+    'achievements_count': lambda: Achievement.objects.all(),
+    'photos_count': lambda: GalleryPhoto.objects.all(),
+    'events_count': lambda: Event.objects.all(),
+    'projects_count': lambda: Project.objects.all(),
+    'blog_posts_count': lambda: BlogPost.objects.all(),
+    'applications_count': lambda: MembershipApplication.objects.filter(status='pending'),
+    'contact_submissions': lambda: ContactSubmission.objects.filter(is_read=False),
+    'newsletter_subscribers': lambda: Newsletter.objects.filter(is_active=True),
+}
+
+
+def compute_dashboard_stats():
+    """Count every dashboard counter in one round trip"""
+    columns = []
+    params = []
+    for name, queryset in COUNTERS.items():
+        sql, sql_params = queryset().order_by().values('pk').query.sql_with_params()
+        columns.append(f'(SELECT COUNT(*) FROM ({sql}) AS counted) AS {connection.ops.quote_name(name)}')
+        params.extend(sql_params)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(columns), params)
+        row = cursor.fetchone()
+    return dict(zip(COUNTERS, row))
+
+
+def get_dashboard_stats():
+    """Cached dashboard counters"""
+    timeout = getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 30)
+    return cache.get_or_set(DASHBOARD_STATS_KEY, compute_dashboard_stats, timeout)
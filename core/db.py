@@ -0,0 +1,50 @@
+"""
+SQLite connection tuning.
+
+Every new SQLite connection runs the ``PRAGMA`` statements listed in the
+``SQLITE_PRAGMAS`` setting (see ``settings.py``; each value can be overridden
+from the environment). The defaults switch to write-ahead logging so readers
+no longer wait behind the writer, wait ``busy_timeout`` milliseconds for a
+lock instead of failing at once, and keep hot pages in memory.
+
+``configure_sqlite_connection`` is connected to ``connection_created`` in
+``core.signals``. ``manage.py benchmark_sqlite`` measures read throughput
+under concurrent writes with and without these pragmas.
+"""
+import re
+
+from django.conf import settings
+
+
+_PRAGMA_NAME_RE = re.compile(r'^[a-z_]+$')
+_PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+def pragma_statements(pragmas):
+    """``PRAGMA name = value`` statements for a ``{name: value}`` mapping"""
+    statements = []
+    for name, value in pragmas.items():
+        value = str(value)
+        if not _PRAGMA_NAME_RE.match(name) or not _PRAGMA_VALUE_RE.match(value):
+            raise ValueError(f'Invalid SQLite pragma {name!r} = {value!r}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(cursor, pragmas):
+    for statement in pragma_statements(pragmas):
+        cursor.execute(statement)
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``SQLITE_PRAGMAS``"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if pragmas:
+        # The raw DB-API cursor keeps these out of query logging and profiling
+        cursor = connection.connection.cursor()
+        try:
+            apply_pragmas(cursor, pragmas)
+        finally:
+            cursor.close()
@@ -0,0 +1,160 @@
+"""
+Constant-memory file downloads.
+
+``file_download_response`` never reads an uploaded file into memory. Depending
+on ``settings.RESOURCE_DOWNLOAD_MODE`` it either streams the file from Django
+(``'stream'``, the default) or hands it off to the front-end web server:
+
+* ``'x-accel'``   nginx ``X-Accel-Redirect`` to ``RESOURCE_X_ACCEL_PREFIX``
+* ``'x-sendfile'`` Apache/lighttpd ``X-Sendfile`` with the file's path
+
+In streaming mode it answers conditional requests (``If-None-Match`` /
+``If-Modified-Since``) with 304 and single byte ranges (``Range`` /
+``If-Range``) with 206, so interrupted downloads can be resumed.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header, http_date, parse_http_date_safe, quote_etag,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag_for(fieldfile, last_modified):
+    return quote_etag(f'{fieldfile.size:x}-{int(last_modified.timestamp()):x}')
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header.
+
+    Returns ``(start, end)`` (inclusive), ``None`` when the header should be
+    ignored (absent, malformed, multi-range or an empty file) and ``False``
+    when the range cannot be satisfied.
+    """
+    if not header or not size:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and since >= int(last_modified.timestamp())
+
+
+def _file_chunks(fieldfile, start, length):
+    with fieldfile.open('rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload_response(fieldfile, filename, mode):
+    response = HttpResponse()
+    content_type, _ = mimetypes.guess_type(filename)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    if mode == 'x-accel':
+        prefix = getattr(settings, 'RESOURCE_X_ACCEL_PREFIX', '/protected-media/')
+        # nginx decodes the URI, so names with spaces, "?" or "%" must be quoted
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + fieldfile.name)
+    else:
+        response['X-Sendfile'] = fieldfile.path
+    return response
+
+
+def file_download_response(request, fieldfile, last_modified):
+    """
+    Build a download response for ``fieldfile``.
+
+    ``last_modified`` (usually the owning object's ``updated_at``) drives
+    the ``Last-Modified`` and ``ETag`` validators.
+    """
+    filename = os.path.basename(fieldfile.name)
+    mode = getattr(settings, 'RESOURCE_DOWNLOAD_MODE', 'stream')
+    if mode in ('x-accel', 'x-sendfile'):
+        return _offload_response(fieldfile, filename, mode)
+
+    size = fieldfile.size
+    etag = _etag_for(fieldfile, last_modified)
+    timestamp = int(last_modified.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        return response
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    content_type, _ = mimetypes.guess_type(filename)
+    content_type = content_type or 'application/octet-stream'
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        # FileResponse uses wsgi.file_wrapper (sendfile) when the server offers it
+        response = FileResponse(
+            fieldfile.open('rb'), as_attachment=True, filename=filename,
+            content_type=content_type,
+        )
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _file_chunks(fieldfile, start, length), status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def is_new_download(request, response):
+    """True for responses that start a download (not HEADs, 304s or resumed ranges)"""
+    if request.method == 'HEAD':
+        return False
+    if response.status_code == 200:
+        return True
+    return response.status_code == 206 and response['Content-Range'].startswith('bytes 0-')
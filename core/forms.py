@@ -1,3 +1,5 @@
+import zipfile
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
@@ -5,8 +7,9 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Field
 from .models import (
     ContactSubmission, Newsletter, MembershipApplication, 
-    BlogPost, FAQ, Project, Resource
+    BlogPost, FAQ, Project, Resource, GalleryPhoto
 )
+from .bulk_upload import IMAGE_EXTENSIONS
 
 
 class ContactForm(forms.ModelForm):
@@ -246,4 +249,44 @@ class ResourceForm(forms.ModelForm):
             Field('external_url', css_class='form-group mb-3'),
             Field('tags', css_class='form-group mb-4'),
             Submit('submit', 'Save Resource', css_class='btn btn-primary')
-        )
\ No newline at end of file
+        )
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """A file field that accepts several files and cleans to a list"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)]
+
+
+class GalleryBulkUploadForm(forms.Form):
+    """Admin form for uploading many gallery photos (or ZIP archives of them) at once"""
+    files = MultipleFileField(
+        widget=MultipleFileInput(attrs={'accept': ','.join(IMAGE_EXTENSIONS + ('.zip',))}),
+        help_text="Select images and/or ZIP archives of images",
+    )
+    caption = forms.CharField(
+        max_length=500, required=False,
+        help_text="Used for every photo; leave empty to use the file names",
+    )
+    category = forms.ChoiceField(choices=GalleryPhoto.CATEGORY_CHOICES, initial='general')
+
+    def clean_files(self):
+        files = self.cleaned_data['files']
+        for upload in files:
+            if upload.name.lower().endswith('.zip'):
+                if not zipfile.is_zipfile(upload):
+                    raise forms.ValidationError(f"{upload.name} is not a valid ZIP archive.")
+                upload.seek(0)
+        return files
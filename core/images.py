@@ -0,0 +1,333 @@
+"""
+Derivative images for uploaded photos.
+
+For every image in ``IMAGE_FIELDS`` a set of smaller copies is stored next to
+the original, under ``<upload dir>/derivatives/<file name>/``:
+
+* ``<width>w.<format>`` for each ``IMAGE_DERIVATIVE_WIDTHS`` entry narrower
+  than the original, in every supported ``IMAGE_DERIVATIVE_FORMATS`` format
+  (AVIF, WebP) plus a JPEG fallback (PNG for images with transparency);
+* ``<name>.webp`` for each fixed-size ``IMAGE_THUMBNAIL_SIZES`` crop;
+* ``manifest.json`` describing what was generated.
+
+Saving an image queues the ``images.process`` task (see ``core.signals`` and
+``core.tasks``), which re-encodes the original upright and without EXIF
+metadata and then generates its derivatives. ``manage.py generate_derivatives``
+regenerates them in the foreground. Templates use the
+``responsive_image`` and ``thumbnail_url`` tags from ``core.templatetags.images``,
+which fall back to the original until its derivatives exist. Manifests are
+cached so rendering a page does not touch storage.
+"""
+import io
+import json
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.dispatch import Signal
+from PIL import Image, ImageOps, JpegImagePlugin, features
+
+from .models import Segment, Member, Achievement, GalleryPhoto, Event, BlogPost, Project
+from .tasks import enqueue, task, task_progress
+
+
+IMAGE_FIELDS = {
+    Segment: ['photo'],
+    Member: ['photo'],
+    Achievement: ['image'],
+    GalleryPhoto: ['image'],
+    Event: ['image'],
+    BlogPost: ['featured_image'],
+    Project: ['image'],
+}
+
+MANIFEST_KEY = 'core:images:manifest:%s'
+MISSING_MANIFEST_TIMEOUT = 60
+MANIFEST_NAME = 'manifest.json'
+
+# Sent with ``instance`` once the derivatives of its images are stored
+derivatives_generated = Signal()
+
+# Formats whose originals are re-encoded (GIFs and other animations are left alone)
+REENCODE_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+_PIL_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP', 'jpg': 'JPEG', 'png': 'PNG'}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpg': 'image/jpeg', 'png': 'image/png'}
+
+
+def derivative_dir(name):
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, 'derivatives', filename)
+
+
+def derivative_name(name, width, extension):
+    return posixpath.join(derivative_dir(name), f'{width}w.{extension}')
+
+
+def thumbnail_name(name, size):
+    return posixpath.join(derivative_dir(name), f'{size}.webp')
+
+
+def supported_formats():
+    return [
+        extension for extension in settings.IMAGE_DERIVATIVE_FORMATS
+        if features.check(extension)
+    ]
+
+
+def _encode(image, extension, **options):
+    buffer = io.BytesIO()
+    if extension == 'png':
+        options['optimize'] = True
+    else:
+        options['quality'] = settings.IMAGE_QUALITY
+        if extension == 'jpg':
+            options.update(optimize=True, progressive=True)
+    image.save(buffer, _PIL_FORMATS[extension], **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _encode_original(image, source, **options):
+    """Encode ``image`` in the format of ``source`` without further quality loss"""
+    if source.format == 'JPEG':
+        # Reuse the source's quantization tables and chroma subsampling
+        options.update(
+            qtables=source.quantization, subsampling=JpegImagePlugin.get_sampling(source),
+            optimize=True,
+        )
+    elif source.format == 'PNG':
+        options['optimize'] = True
+    else:
+        options['lossless'] = True
+    buffer = io.BytesIO()
+    image.save(buffer, source.format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, content)
+
+
+def open_image(fieldfile):
+    """Open ``fieldfile`` upright (EXIF orientation applied) and fully decoded"""
+    with fieldfile.storage.open(fieldfile.name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def sanitize_original(fieldfile):
+    """
+    Rewrite the original of ``fieldfile`` upright and without EXIF metadata
+    (camera details, GPS position). The colour profile is kept, and so is the
+    quality: JPEGs are re-encoded with their own quantization tables, PNG and
+    WebP losslessly.
+
+    Returns the decoded, upright image. The file is left untouched if it had
+    no metadata and re-encoding would not make it smaller, or if it is
+    animated.
+    """
+    with fieldfile.storage.open(fieldfile.name, 'rb') as f:
+        original = f.read()
+    image = Image.open(io.BytesIO(original))
+    image.load()
+    source_format = image.format
+    has_metadata = bool(image.getexif()) or 'exif' in image.info
+    upright = ImageOps.exif_transpose(image)
+    if source_format not in REENCODE_FORMATS or getattr(image, 'n_frames', 1) > 1:
+        return upright
+
+    options = {}
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    content = _encode_original(upright, image, **options)
+    if has_metadata or content.size < len(original):
+        _save(fieldfile.storage, fieldfile.name, content)
+    return upright
+
+
+def render_derivatives(image):
+    """
+    Encode the derivatives of a decoded ``image``.
+
+    Returns ``(manifest, files)`` where ``files`` maps names relative to the
+    derivative directory to their encoded ``ContentFile``. Pure CPU work, so
+    it can run in another process.
+    """
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'png' if has_alpha else 'jpg'
+    formats = supported_formats() + [fallback]
+
+    files = {}
+    widths = [width for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS) if width < image.width]
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for extension in formats:
+            files[f'{width}w.{extension}'] = _encode(resized, extension)
+
+    for size, dimensions in settings.IMAGE_THUMBNAIL_SIZES.items():
+        thumbnail = ImageOps.fit(image, dimensions, Image.Resampling.LANCZOS)
+        files[f'{size}.webp'] = _encode(thumbnail, 'webp')
+
+    manifest = {
+        'width': image.width,
+        'height': image.height,
+        'widths': widths,
+        'formats': formats[:-1],
+        'fallback': fallback,
+        'thumbnails': list(settings.IMAGE_THUMBNAIL_SIZES),
+    }
+    return manifest, files
+
+
+def write_derivatives(fieldfile, manifest, files):
+    storage = fieldfile.storage
+    directory = derivative_dir(fieldfile.name)
+    for name, content in files.items():
+        _save(storage, posixpath.join(directory, name), content)
+    _save(storage, posixpath.join(directory, MANIFEST_NAME), ContentFile(json.dumps(manifest).encode()))
+
+
+def store_derivatives(fieldfile, manifest, files):
+    write_derivatives(fieldfile, manifest, files)
+    cache.set(MANIFEST_KEY % fieldfile.name, manifest, None)
+
+
+def generate_derivatives(fieldfile):
+    """Create (or recreate) every derivative of ``fieldfile``; returns the manifest"""
+    manifest, files = render_derivatives(open_image(fieldfile))
+    store_derivatives(fieldfile, manifest, files)
+    return manifest
+
+
+def get_manifest(fieldfile):
+    """The derivative manifest of ``fieldfile``, or None if none exist yet"""
+    if not fieldfile:
+        return None
+    key = MANIFEST_KEY % fieldfile.name
+    manifest = cache.get(key)
+    if manifest is None:
+        name = posixpath.join(derivative_dir(fieldfile.name), MANIFEST_NAME)
+        try:
+            with fieldfile.storage.open(name, 'rb') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        cache.set(key, manifest, None if manifest else MISSING_MANIFEST_TIMEOUT)
+    return manifest or None
+
+
+def image_fields(instance):
+    """The non-empty image ``FieldFile`` objects of ``instance``"""
+    return [
+        getattr(instance, field) for field in IMAGE_FIELDS.get(type(instance), ())
+        if getattr(instance, field)
+    ]
+
+
+def needs_derivatives(fieldfile):
+    return get_manifest(fieldfile) is None and fieldfile.storage.exists(fieldfile.name)
+
+
+def queue_processing(instance):
+    """Queue ``images.process`` if any image of ``instance`` lacks derivatives"""
+    if any(needs_derivatives(fieldfile) for fieldfile in image_fields(instance)):
+        return enqueue('images.process', instance._meta.label_lower, instance.pk)
+    return None
+
+
+@task('images.process')
+def process_images(queued, model_label, pk):
+    """Sanitize the new images of one object and generate their derivatives"""
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    fieldfiles = [fieldfile for fieldfile in image_fields(instance) if needs_derivatives(fieldfile)]
+    steps = 3 * len(fieldfiles)
+    for n, fieldfile in enumerate(fieldfiles):
+        image = sanitize_original(fieldfile)
+        task_progress(queued, 3 * n + 1, steps, f'Re-encoded {fieldfile.name}')
+        manifest, files = render_derivatives(image)
+        task_progress(queued, 3 * n + 2, steps, f'Rendered {len(files)} derivatives of {fieldfile.name}')
+        store_derivatives(fieldfile, manifest, files)
+        task_progress(queued, 3 * n + 3, steps, f'Stored derivatives of {fieldfile.name}')
+    if fieldfiles:
+        derivatives_generated.send(sender=type(instance), instance=instance)
+
+
+def srcset(fieldfile, manifest, extension):
+    storage = fieldfile.storage
+    return ', '.join(
+        f'{storage.url(derivative_name(fieldfile.name, width, extension))} {width}w'
+        for width in manifest['widths']
+    )
+
+
+def thumbnail_url(fieldfile, size):
+    """URL of the ``size`` thumbnail of ``fieldfile``, or of the original"""
+    if not fieldfile:
+        return ''
+    manifest = get_manifest(fieldfile)
+    if manifest and size in manifest['thumbnails']:
+        return fieldfile.storage.url(thumbnail_name(fieldfile.name, size))
+    return fieldfile.url
+
+
+def _process_stored_image(model_label, field_name, name):
+    """Sanitize one original and write its derivatives; runs in a pool process"""
+    field = apps.get_model(model_label)._meta.get_field(field_name)
+    fieldfile = field.attr_class(None, field, name)
+    manifest, files = render_derivatives(sanitize_original(fieldfile))
+    write_derivatives(fieldfile, manifest, files)
+    return manifest
+
+
+def process_in_pool(fieldfiles):
+    """
+    Sanitize ``fieldfiles`` and generate their derivatives across
+    ``IMAGE_PROCESS_WORKERS`` processes (default: one per CPU).
+
+    Yields ``(fieldfile, manifest)`` as each image finishes, with the
+    exception in place of the manifest if it failed.
+    """
+    jobs = [(fieldfile.instance._meta.label_lower, fieldfile.field.name, fieldfile.name) for fieldfile in fieldfiles]
+    workers = min(settings.IMAGE_PROCESS_WORKERS or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for fieldfile, job in zip(fieldfiles, jobs):
+            try:
+                yield fieldfile, _process_stored_image(*job)
+            except Exception as exc:
+                yield fieldfile, exc
+        return
+    with ProcessPoolExecutor(workers, initializer=django.setup) as executor:
+        futures = {executor.submit(_process_stored_image, *job): fieldfile for fieldfile, job in zip(fieldfiles, jobs)}
+        for future in as_completed(futures):
+            yield futures[future], future.exception() or future.result()
+
+
+@task('images.process_batch')
+def process_image_batch(queued, model_label, pks):
+    """Process the new images of many objects at once, e.g. a bulk gallery upload"""
+    fieldfiles = [
+        fieldfile for instance in apps.get_model(model_label).objects.filter(pk__in=pks)
+        for fieldfile in image_fields(instance) if needs_derivatives(fieldfile)
+    ]
+    failed = []
+    for done, (fieldfile, result) in enumerate(process_in_pool(fieldfiles), 1):
+        if isinstance(result, Exception):
+            failed.append(f'{fieldfile.name}: {result!r}')
+        else:
+            cache.set(MANIFEST_KEY % fieldfile.name, result, None)
+            derivatives_generated.send(sender=type(fieldfile.instance), instance=fieldfile.instance)
+        task_progress(queued, done, len(fieldfiles), f'{done - len(failed)} of {len(fieldfiles)} images processed')
+    if failed:
+        raise RuntimeError(f'{len(failed)} image(s) failed:\n' + '\n'.join(failed))
@@ -0,0 +1,89 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+
+VIEWS = [
+    'core:home', 'core:members', 'core:events', 'core:blog',
+    'core:projects', 'core:resources', 'core:faq', 'core:search',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time requests to the core views with a new database connection per '
+        'request (CONN_MAX_AGE=0) and with persistent connections'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per view and mode')
+        parser.add_argument(
+            '--max-age', type=int, default=None,
+            help='CONN_MAX_AGE for the persistent run (defaults to the configured value, or 60)',
+        )
+
+    def set_max_age(self, max_age):
+        for connection in connections.all():
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+    def request(self, handler, url, params=None):
+        """
+        Run one request through the WSGI handler, as a server would.
+
+        The test ``Client`` disconnects ``close_old_connections`` from the
+        request signals, which would keep the connection open whatever
+        ``CONN_MAX_AGE`` says; the handler sends them normally.
+        """
+        environ = RequestFactory().get(url, params).environ
+        response = handler(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()  # sends request_finished
+
+    def time_view(self, handler, url, requests, label):
+        timings = []
+        for n in range(requests):
+            # A fresh query string each time skips the page cache
+            params = {'bench': f'{label}-{n}-{time.time_ns()}', 'query': 'club'}
+            start = time.perf_counter()
+            self.request(handler, url, params)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        configured = connections['default'].settings_dict['CONN_MAX_AGE']
+        if 'pool' in connections['default'].settings_dict.get('OPTIONS', {}):
+            # Pooling and CONN_MAX_AGE cannot be combined; time the pool alone
+            modes = [('pooled', 0)]
+        else:
+            persistent = options['max_age'] or configured or 60
+            modes = [('per-request', 0), (f'max-age={persistent}', persistent)]
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                for label, max_age in modes:
+                    self.set_max_age(max_age)
+                    handler = WSGIHandler()
+                    for name in VIEWS:
+                        url = reverse(name)
+                        self.request(handler, url)  # warm imports and templates
+                        results[(name, label)] = self.time_view(handler, url, options['requests'], label)
+            finally:
+                self.set_max_age(configured)
+
+        header = f'{"view":<16}' + ''.join(f'{label + " mean/p95 ms":>28}' for label, _ in modes)
+        self.stdout.write(header)
+        for name in VIEWS:
+            row = f'{name:<16}'
+            for label, _ in modes:
+                timings = results[(name, label)]
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                row += f'{statistics.mean(timings):>20.2f} / {p95:>5.2f}'
+            self.stdout.write(row)
@@ -0,0 +1,74 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+PUBLIC_URLS = ['core:home', 'core:events', 'core:blog', 'core:projects', 'core:faq']
+
+EAGER = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'SESSION_SAVE_EVERY_REQUEST': True,
+    'MIDDLEWARE': [
+        'django.contrib.sessions.middleware.SessionMiddleware'
+        if name == 'core.sessions.LazySessionMiddleware' else name
+        for name in settings.MIDDLEWARE
+    ],
+}
+
+
+def is_session_write(sql):
+    return 'django_session' in sql and sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay public page views from visitors holding a session and count '
+        'session writes, with eager (save every request) and lazy sessions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--visitors', type=int, default=20)
+        parser.add_argument(
+            '--requests', type=int, default=25,
+            help='Page views per visitor',
+        )
+
+    def run(self, visitors, requests):
+        engine = import_module(settings.SESSION_ENGINE)
+        clients = []
+        for i in range(visitors):
+            session = engine.SessionStore()
+            session['visitor'] = i
+            session.save()
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            clients.append(client)
+
+        urls = [reverse(name) for name in PUBLIC_URLS]
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            for n in range(requests):
+                for client in clients:
+                    client.get(urls[n % len(urls)])
+        elapsed = time.perf_counter() - start
+        writes = sum(is_session_write(query['sql']) for query in context.captured_queries)
+        return writes, visitors * requests, elapsed
+
+    def handle(self, *args, **options):
+        modes = [('eager', EAGER), ('lazy', {})]
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for label, overrides in modes:
+                # Everything the benchmark writes is rolled back
+                with transaction.atomic(), override_settings(**overrides):
+                    writes, total, elapsed = self.run(options['visitors'], options['requests'])
+                    transaction.set_rollback(True)
+                self.stdout.write(
+                    f'{label:>5}: {total} requests, {writes} session writes '
+                    f'({writes / total:.2f}/request), {elapsed:.2f}s'
+                )
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure SQLite read throughput while other threads write, with the '
+        'default journal and with SQLITE_PRAGMAS, on a scratch database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--rows', type=int, default=5000, help='Rows seeded before the run')
+
+    def connect(self, path, pragmas):
+        db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        apply_pragmas(db.cursor(), pragmas)
+        return db
+
+    def seed(self, path, pragmas, rows):
+        db = self.connect(path, pragmas)
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, created REAL)')
+        db.execute('CREATE INDEX post_created ON post (created)')
+        db.execute('BEGIN')
+        db.executemany(
+            'INSERT INTO post (title, created) VALUES (?, ?)',
+            ((f'Post {i}', time.time()) for i in range(rows)),
+        )
+        db.execute('COMMIT')
+        db.close()
+
+    def run(self, path, pragmas, options):
+        stop = threading.Event()
+        reads, writes, errors = [0], [0], [0]
+        lock = threading.Lock()
+
+        def reader():
+            db = self.connect(path, pragmas)
+            done = 0
+            while not stop.is_set():
+                try:
+                    db.execute('SELECT id, title FROM post ORDER BY created DESC LIMIT 20').fetchall()
+                    done += 1
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+            db.close()
+            with lock:
+                reads[0] += done
+
+        def writer():
+            db = self.connect(path, pragmas)
+            done = 0
+            while not stop.is_set():
+                try:
+                    db.execute('BEGIN IMMEDIATE')
+                    db.execute('INSERT INTO post (title, created) VALUES (?, ?)', ('New', time.time()))
+                    db.execute('COMMIT')
+                    done += 1
+                except sqlite3.OperationalError:
+                    if db.in_transaction:
+                        db.execute('ROLLBACK')
+                    with lock:
+                        errors[0] += 1
+            db.close()
+            with lock:
+                writes[0] += done
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return reads[0], writes[0], errors[0]
+
+    def handle(self, *args, **options):
+        modes = [
+            ('default', {}),
+            ('tuned', settings.SQLITE_PRAGMAS),
+        ]
+        for label, pragmas in modes:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.seed(path, pragmas, options['rows'])
+                reads, writes, errors = self.run(path, pragmas, options)
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{label:>7}: {reads / seconds:,.0f} reads/s, {writes / seconds:,.0f} writes/s, '
+                f'{errors} lock errors'
+            )
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import css
+
+
+SOURCE = Path('static/css/style.css')
+MINIFIED = Path('static/css/style.min.css')
+CRITICAL = Path('templates/core/home_critical_css.html')
+# The markup visible before scrolling on the homepage: base.html up to the
+# content block, then home.html up to FOLD_MARKER
+BASE_TEMPLATE = Path('templates/base.html')
+HOME_TEMPLATE = Path('templates/core/home.html')
+FOLD_MARKER = '{# end of above-the-fold content #}'
+
+CRITICAL_TEMPLATE = (
+    '{{# Generated by "manage.py build_css" from {source}; do not edit #}}\n'
+    '<style>{{% verbatim %}}{rules}{{% endverbatim %}}</style>\n'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Minify static/css/style.css and extract the rules needed to render '
+        'the top of the homepage, which base.html inlines'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Fail if the generated files are out of date instead of writing them',
+        )
+
+    def above_the_fold_markup(self):
+        base = (settings.BASE_DIR / BASE_TEMPLATE).read_text()
+        home = (settings.BASE_DIR / HOME_TEMPLATE).read_text()
+        if FOLD_MARKER not in home:
+            raise CommandError(f'{HOME_TEMPLATE} has no {FOLD_MARKER} marker.')
+        return base.split('{% block content %}')[0] + home.split(FOLD_MARKER)[0]
+
+    def handle(self, *args, **options):
+        minified = css.minify((settings.BASE_DIR / SOURCE).read_text())
+        critical = css.critical_css(minified, self.above_the_fold_markup())
+        outputs = {
+            MINIFIED: minified + '\n',
+            CRITICAL: CRITICAL_TEMPLATE.format(source=SOURCE, rules=critical),
+        }
+
+        stale = [
+            path for path, content in outputs.items()
+            if not (settings.BASE_DIR / path).exists() or (settings.BASE_DIR / path).read_text() != content
+        ]
+        if options['check']:
+            if stale:
+                raise CommandError(f'Out of date: {", ".join(map(str, stale))}. Run "manage.py build_css".')
+            self.stdout.write('Generated CSS is up to date.')
+            return
+
+        for path in stale:
+            (settings.BASE_DIR / path).write_text(outputs[path])
+        source_size = (settings.BASE_DIR / SOURCE).stat().st_size
+        self.stdout.write(self.style.SUCCESS(
+            f'{MINIFIED}: {len(minified)} bytes (from {source_size}); '
+            f'{CRITICAL}: {len(critical)} bytes of critical CSS.'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import flush_download_counts
+
+
+class Command(BaseCommand):
+    help = 'Write buffered resource download counts to the database'
+
+    def handle(self, *args, **options):
+        total = flush_download_counts()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {total} downloads.'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, UnidentifiedImageError
+
+from core import images
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive derivatives and thumbnails of uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate derivatives that already exist',
+        )
+        parser.add_argument(
+            '--model', action='append', default=[],
+            help='Only process this model (by name, e.g. GalleryPhoto); may be repeated',
+        )
+
+    def handle(self, *args, **options):
+        models = {model.__name__.lower(): model for model in images.IMAGE_FIELDS}
+        selected = [name.lower() for name in options['model']]
+        unknown = [name for name in selected if name not in models]
+        if unknown:
+            raise CommandError(f'Unknown model(s): {", ".join(unknown)}. Choose from {", ".join(sorted(models))}.')
+
+        generated = failed = 0
+        for name, model in models.items():
+            if selected and name not in selected:
+                continue
+            for instance in model.objects.iterator():
+                for fieldfile in images.image_fields(instance):
+                    if not options['force'] and not images.needs_derivatives(fieldfile):
+                        continue
+                    try:
+                        images.generate_derivatives(fieldfile)
+                    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+                        failed += 1
+                        self.stderr.write(f'{fieldfile.name}: {exc}')
+                    else:
+                        generated += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {generated} images ({failed} failed).'))
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+URLCONFS = ['ncc_website.urls', 'ncc_website.async_urls']
+PATHS = [
+    ('/', ''), ('/faq/', ''), ('/search/', 'query=club'), ('/members/', ''),
+    ('/events/', ''), ('/blog/', ''), ('/projects/', ''), ('/resources/', ''),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the ASGI application in-process with concurrent requests and '
+        'compare throughput of the sync and async public views'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per URLconf')
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Let the page cache answer repeat requests (by default every request misses it)',
+        )
+
+    async def request(self, app, path, query_string):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query_string.encode(), 'root_path': '',
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+        }
+        disconnected = asyncio.Event()
+        sent_body = False
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        status = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        try:
+            await app(scope, receive, send)
+        finally:
+            disconnected.set()
+        return status[0]
+
+    async def run(self, app, options):
+        queue = asyncio.Queue()
+        for n in range(options['requests']):
+            path, query_string = PATHS[n % len(PATHS)]
+            if not options['cached']:
+                query_string = '&'.join(filter(None, [query_string, f'load={time.time_ns()}-{n}']))
+            queue.put_nowait((path, query_string))
+        errors = []
+
+        async def worker():
+            while not queue.empty():
+                path, query_string = queue.get_nowait()
+                status = await self.request(app, path, query_string)
+                if status != 200:
+                    errors.append((path, status))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        return time.perf_counter() - start, errors
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for urlconf in URLCONFS:
+                with override_settings(ROOT_URLCONF=urlconf):
+                    app = ASGIHandler()
+                    asyncio.run(self.run(app, {**options, 'requests': len(PATHS)}))  # warm up
+                    elapsed, errors = asyncio.run(self.run(app, options))
+                self.stdout.write(
+                    f'{urlconf:<24} {options["requests"] / elapsed:8.1f} req/s '
+                    f'({options["concurrency"]} concurrent, {len(errors)} non-200)'
+                )
+                for path, status in errors[:5]:
+                    self.stdout.write(f'    {status} {path}')
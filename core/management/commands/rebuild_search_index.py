@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of rows fetched per query while indexing',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            raise CommandError('The full-text search index requires SQLite (FTS5).')
+
+        self.stdout.write('Rebuilding search index...')
+        total = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} objects.'))
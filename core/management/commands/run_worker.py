@@ -0,0 +1,45 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (image processing) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run the tasks that are due now, then exit',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write('Worker started.')
+        while not self.stopping:
+            close_old_connections()
+            queued = tasks.claim_task()
+            if queued is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            start = time.perf_counter()
+            succeeded = tasks.run_task(queued)
+            outcome = self.style.SUCCESS('done') if succeeded else self.style.ERROR(queued.status)
+            self.stdout.write(f'{queued} {outcome} in {time.perf_counter() - start:.2f}s')
+        self.stdout.write('Worker stopped.')
+
+    def stop(self, signum, frame):
+        # Finish the current task; claimed-but-unfinished work would otherwise wait for TASK_TIMEOUT
+        self.stopping = True
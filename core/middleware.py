@@ -0,0 +1,141 @@
+"""
+Query profiling middleware.
+
+``QueryCountMiddleware`` records how many SQL queries each request runs, how
+long they took and which one was slowest. With ``DEBUG`` on the numbers are
+added to the response as ``X-Query-Count``, ``X-Query-Time-Ms`` and
+``X-Slowest-Query-Ms`` headers; in every mode they are folded into an
+in-memory, per-URL-name report available from ``get_query_report`` (and as
+JSON to staff at ``core:admin_query_report``).
+
+Under ASGI the async ORM runs its queries in the thread-sensitive sync
+thread, which has its own connections, so the async path installs its
+wrappers in that thread.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+
+SLOW_SQL_MAX_LENGTH = 500
+
+_report = {}
+_report_lock = threading.Lock()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that tallies queries for one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total_time += duration
+            if duration >= self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+
+
+def record(url_name, recorder):
+    """Fold one request's numbers into the per-URL report"""
+    with _report_lock:
+        entry = _report.setdefault(url_name, {
+            'requests': 0,
+            'queries': 0,
+            'max_queries': 0,
+            'sql_time_ms': 0.0,
+            'slowest_ms': 0.0,
+            'slowest_sql': '',
+        })
+        entry['requests'] += 1
+        entry['queries'] += recorder.count
+        entry['max_queries'] = max(entry['max_queries'], recorder.count)
+        entry['sql_time_ms'] += recorder.total_time * 1000
+        if recorder.slowest_time * 1000 >= entry['slowest_ms']:
+            entry['slowest_ms'] = recorder.slowest_time * 1000
+            entry['slowest_sql'] = recorder.slowest_sql[:SLOW_SQL_MAX_LENGTH]
+
+
+def get_query_report():
+    """Per-URL-name query statistics for this process, heaviest first"""
+    with _report_lock:
+        report = {name: dict(entry) for name, entry in _report.items()}
+    for entry in report.values():
+        entry['avg_queries'] = entry['queries'] / entry['requests']
+        entry['avg_sql_time_ms'] = entry['sql_time_ms'] / entry['requests']
+    return dict(sorted(report.items(), key=lambda item: -item[1]['avg_queries']))
+
+
+def reset_query_report():
+    with _report_lock:
+        _report.clear()
+
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Page-cache hits are answered before URL resolution
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return '<unresolved>'
+    return match.view_name
+
+
+class QueryCountMiddleware:
+    """Instrument every request's database access (see module docstring)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @contextmanager
+    def recording(self):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            # Wrappers are per-thread objects; this does not open connections
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.recording() as recorder:
+            response = self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        recording = self.recording()
+        recorder = await sync_to_async(recording.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.__exit__)(None, None, None)
+        return self.finish(request, response, recorder)
+
+    def finish(self, request, response, recorder):
+        record(_url_name(request), recorder)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f'{recorder.total_time * 1000:.2f}'
+            response['X-Slowest-Query-Ms'] = f'{recorder.slowest_time * 1000:.2f}'
+        return response
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+
+CREATE_INDEX_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    tags,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the icontains fallback in core.search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX_SQL)
+
+
+# Frozen copy of core.search.SEARCHABLE_MODELS: (kind, model, filter, title, body, tags)
+INDEXED_MODELS = [
+    ('members', 'Member', {}, ['name'], ['role', 'bio'], []),
+    ('events', 'Event', {}, ['title'], ['description'], []),
+    ('achievements', 'Achievement', {}, ['title'], ['description'], []),
+    ('blog_posts', 'BlogPost', {'status': 'published'}, ['title'], ['excerpt', 'content'], ['tags']),
+    ('projects', 'Project', {}, ['title'], ['description'], ['technologies']),
+    ('resources', 'Resource', {}, ['title'], ['description'], ['tags']),
+]
+
+
+def populate_search_index(apps, schema_editor):
+    """Index the rows that already exist; signals keep it current afterwards"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    def value(instance, fields):
+        return ' '.join(str(getattr(instance, field) or '') for field in fields)
+
+    with schema_editor.connection.cursor() as cursor:
+        for kind, model_name, filters, title, body, tags in INDEXED_MODELS:
+            model = apps.get_model('core', model_name)
+            cursor.executemany(
+                'INSERT INTO core_search_index (kind, object_id, title, body, tags) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (kind, instance.pk, value(instance, title), value(instance, body), value(instance, tags))
+                    for instance in model.objects.filter(**filters).iterator(chunk_size=500)
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS core_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_contactsubmission_faq_newsletter_resource_blogpost_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
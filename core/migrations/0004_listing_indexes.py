@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['category', '-date'], name='achievement_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['status', '-published_at', 'id'], name='blogpost_status_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['-created_at'], name='contact_unread_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', '-date'], name='event_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='faq',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'question'], name='faq_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryphoto',
+            index=models.Index(fields=['-uploaded_at', 'id'], name='gallery_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryphoto',
+            index=models.Index(fields=['category', '-uploaded_at', 'id'], name='gallery_category_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['segment', '-created_at'], name='project_segment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['-is_featured', '-created_at'], name='resource_featured_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_uploaded_at(apps, schema_editor):
+    """Existing photos were last changed, as far as anyone knows, when uploaded"""
+    GalleryPhoto = apps.get_model('core', 'GalleryPhoto')
+    GalleryPhoto.objects.update(updated_at=models.F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryphoto',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_uploaded_at, migrations.RunPython.noop),
+    ]
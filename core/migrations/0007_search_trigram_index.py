@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+CREATE_INDEX_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS core_search_trigram USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    tags,
+    tokenize = 'trigram'
+)
+"""
+
+
+def create_trigram_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the icontains fallback in core.search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX_SQL)
+    # The rows of the word index, which holds the same columns
+    schema_editor.execute(
+        'INSERT INTO core_search_trigram (kind, object_id, title, body, tags) '
+        'SELECT kind, object_id, title, body, tags FROM core_search_index'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS core_search_trigram')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_galleryphoto_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
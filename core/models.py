@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 import json
 
 
@@ -99,6 +100,9 @@ class Achievement(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['category', '-date'], name='achievement_category_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -121,9 +125,14 @@ class GalleryPhoto(models.Model):
     caption = models.CharField(max_length=500)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='general')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['-uploaded_at', 'id'], name='gallery_uploaded_idx'),
+            models.Index(fields=['category', '-uploaded_at', 'id'], name='gallery_category_uploaded_idx'),
+        ]
 
     def __str__(self):
         return f"Gallery: {self.caption[:50]}"
@@ -148,6 +157,9 @@ class Event(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['status', '-date'], name='event_status_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -176,6 +188,13 @@ class ContactSubmission(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Partial: the dashboard only counts and lists unread messages
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_read=False),
+                name='contact_unread_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.get_subject_display()}"
@@ -214,6 +233,9 @@ class BlogPost(models.Model):
 
     class Meta:
         ordering = ['-published_at', '-created_at']
+        indexes = [
+            models.Index(fields=['status', '-published_at', 'id'], name='blogpost_status_published_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -246,6 +268,13 @@ class FAQ(models.Model):
 
     class Meta:
         ordering = ['order', 'question']
+        indexes = [
+            # Partial: Django renders is_active=True as a bare boolean term
+            models.Index(
+                fields=['order', 'question'], condition=models.Q(is_active=True),
+                name='faq_active_order_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.question[:100]
@@ -276,6 +305,10 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+            models.Index(fields=['segment', '-created_at'], name='project_segment_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -313,6 +346,9 @@ class Resource(models.Model):
 
     class Meta:
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            models.Index(fields=['-is_featured', '-created_at'], name='resource_featured_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -361,3 +397,37 @@ class MembershipApplication(models.Model):
 
     def __str__(self):
         return f"{self.full_name} - {self.get_status_display()}"
+
+
+class Task(models.Model):
+    """A unit of background work, run by ``manage.py run_worker`` (see ``core.tasks``)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    key = models.CharField(max_length=255, db_index=True, help_text="Identifies duplicate tasks")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    progress_message = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='task_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}({', '.join(map(str, self.args))})"
@@ -0,0 +1,244 @@
+"""
+Keyset (cursor) pagination.
+
+Django's ``Paginator`` runs ``COUNT(*)`` and ``OFFSET n`` for every page, both of
+which get slower the deeper a visitor scrolls. ``CursorPaginator`` instead
+remembers the sort key of the last row shown and asks for rows strictly
+after it, so every page costs the same regardless of depth. The trade-off is
+that pages are not numbered: there is only "next" and "previous".
+
+List views opt in with ``CursorPaginationMixin`` and ``cursor_pagination = True``.
+The mixin also provides ``apaginate_queryset`` for the async list views.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import F, Q
+from django.http import Http404
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        # Full precision: the value has to compare equal to the stored one
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def encode_cursor(values, direction='next'):
+    payload = json.dumps({'v': values, 'd': direction}, default=_encode_value)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(values, direction)``; raises ``InvalidPage`` for bad input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidPage('Invalid cursor')
+    if direction not in ('next', 'previous') or not isinstance(values, list):
+        raise InvalidPage('Invalid cursor')
+    return values, direction
+
+
+class CursorPage:
+    """One page of results; mirrors the parts of ``Page`` templates use"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` by its ordering.
+
+    The ordering is taken from the queryset (``order_by``) or the model's
+    ``Meta.ordering``; the primary key is appended as a tie-breaker so the
+    key is unique. NULLs always sort as the lowest values.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = self._resolve_ordering(ordering)
+
+    def _resolve_ordering(self, ordering):
+        model = self.queryset.model
+        if ordering is None:
+            ordering = self.queryset.query.order_by or model._meta.ordering
+        resolved = []
+        for field in ordering:
+            if not isinstance(field, str) or field == '?' or '__' in field:
+                raise ValueError(f'Cannot paginate by cursor on ordering {field!r}')
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if name == 'pk':
+                name = model._meta.pk.attname
+            resolved.append((model._meta.get_field(name).attname, descending))
+        if model._meta.pk.attname not in [name for name, _ in resolved]:
+            resolved.append((model._meta.pk.attname, False))
+        return resolved
+
+    def _order_by(self, reverse=False):
+        expressions = []
+        for name, descending in self.ordering:
+            if descending != reverse:
+                expressions.append(F(name).desc(nulls_last=True))
+            else:
+                expressions.append(F(name).asc(nulls_first=True))
+        return expressions
+
+    def _after(self, values, reverse=False):
+        """Filter for rows strictly after ``values`` in (possibly reversed) order"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            descending = descending != reverse
+            if value is None:
+                # NULL is the lowest value: everything non-null is above it
+                beyond = Q(pk__in=[]) if descending else Q(**{f'{name}__isnull': False})
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                lookup = 'lt' if descending else 'gt'
+                beyond = Q(**{f'{name}__{lookup}': value})
+                if descending:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def _to_python(self, values):
+        """Convert decoded cursor values to the ordering fields' types"""
+        if len(values) != len(self.ordering):
+            raise InvalidPage('Invalid cursor')
+        model = self.queryset.model
+        try:
+            return [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidPage('Invalid cursor')
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name, _ in self.ordering]
+
+    def _page_queryset(self, cursor):
+        """Return ``(queryset, reverse)`` fetching one row more than a page"""
+        direction = 'next'
+        queryset = self.queryset
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            values = self._to_python(values)
+            queryset = queryset.filter(self._after(values, reverse=direction == 'previous'))
+        reverse = direction == 'previous'
+        return queryset.order_by(*self._order_by(reverse))[:self.per_page + 1], reverse
+
+    def page(self, cursor=None):
+        queryset, reverse = self._page_queryset(cursor)
+        return self._build_page(list(queryset), cursor, reverse)
+
+    async def apage(self, cursor=None):
+        queryset, reverse = self._page_queryset(cursor)
+        return self._build_page([obj async for obj in queryset], cursor, reverse)
+
+    def _build_page(self, rows, cursor, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(self._key(rows[-1]), 'next')
+            if cursor and (has_more or not reverse):
+                previous_cursor = encode_cursor(self._key(rows[0]), 'previous')
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for ``ListView`` subclasses.
+
+    With ``cursor_pagination = True`` the page is selected by the ``cursor``
+    query parameter instead of ``page`` and ``page_obj`` is a ``CursorPage``
+    exposing ``next_cursor``/``previous_cursor``.
+    """
+    cursor_pagination = False
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_query_param))
+        except InvalidPage as e:
+            raise Http404(f'Invalid page ({e})')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """``paginate_queryset`` for async views, using the async ORM"""
+        if self.cursor_pagination:
+            paginator = CursorPaginator(queryset, page_size)
+            try:
+                page = await paginator.apage(self.request.GET.get(self.cursor_query_param))
+            except InvalidPage as e:
+                raise Http404(f'Invalid page ({e})')
+            return (paginator, page, page.object_list, page.has_other_pages())
+
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        paginator.count = await queryset.acount()  # primes the cached property
+        page_kwarg = self.page_kwarg
+        page_number = self.kwargs.get(page_kwarg) or self.request.GET.get(page_kwarg) or 1
+        if page_number == 'last':
+            page_number = paginator.num_pages
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as e:
+            raise Http404(f'Invalid page ({e})')
+        bottom = (number - 1) * paginator.per_page
+        top = bottom + paginator.per_page
+        if top + paginator.orphans >= paginator.count:
+            top = paginator.count
+        rows = [obj async for obj in queryset[bottom:top]]
+        page = paginator._get_page(rows, number, paginator)
+        return (paginator, page, page.object_list, page.has_other_pages())
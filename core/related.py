@@ -0,0 +1,40 @@
+"""
+Cached "related items" lists for detail pages.
+
+``related_posts`` on a blog post and ``related_projects`` on a project are
+the same for every visitor, so they are cached per object. Any save or
+delete of the related model bumps that model's version number (see
+``core.signals``), which retires every cached list that could contain it.
+The same versions go into the ETags of pages showing rows of those models.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+VERSION_KEY = 'core:related:%s:version'
+
+
+def related_version(model):
+    """Current version of ``model``'s cached related lists"""
+    return cache.get_or_set(VERSION_KEY % model._meta.label_lower, 1, None)
+
+
+def get_related_items(obj, name, queryset, model):
+    """
+    Return ``list(queryset())`` for ``obj``, cached until ``model`` changes.
+
+    ``queryset`` is a callable so nothing is queried on a cache hit.
+    """
+    key = 'core:related:%s:%s:%s:v%s' % (
+        obj._meta.label_lower, obj.pk, name, related_version(model),
+    )
+    timeout = getattr(settings, 'RELATED_ITEMS_TIMEOUT', 60 * 60)
+    return cache.get_or_set(key, lambda: list(queryset()), timeout)
+
+
+def invalidate_related_items(model):
+    key = VERSION_KEY % model._meta.label_lower
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
@@ -0,0 +1,114 @@
+"""
+Primary/replica database routing.
+
+When a ``replica`` database is configured (``DATABASE_REPLICA_NAME``, see
+``settings.py``), ``PrimaryReplicaRouter`` sends reads made while serving
+public ``GET``/``HEAD`` requests to it. Everything else goes to ``default``:
+all writes, the admin, form submissions, management commands and background
+threads.
+
+Reads stick to the primary once the request has written anything. Visitors
+who have just written something also get a short-lived cookie, so for
+``REPLICA_PIN_SECONDS`` their following requests (typically the redirect
+after a form post) read from the primary too and see their own changes
+despite replication lag.
+
+The state lives in context variables rather than thread locals so it follows
+a request into ``sync_to_async`` threads and asyncio tasks.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import reverse
+
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+
+_use_replica = ContextVar('core_use_replica', default=False)
+_wrote = ContextVar('core_wrote_to_primary', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def request_routing(use_replica):
+    """Scope of one request: reads may use the replica until something is written"""
+    use_token = _use_replica.set(use_replica)
+    wrote_token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(use_token)
+        _wrote.reset(wrote_token)
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _wrote.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # Session refreshes are bookkeeping, not the visitor's own content
+        if model._meta.app_label != 'sessions':
+            _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may use the replica (see module docstring)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def use_replica(self, request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and PIN_COOKIE not in request.COOKIES
+            and not request.path_info.startswith(reverse('admin:index'))
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+        with request_routing(self.use_replica(request)):
+            response = self.get_response(request)
+            pin = wrote_to_primary()
+        return self.finish(response, pin)
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+        with request_routing(self.use_replica(request)):
+            response = await self.get_response(request)
+            pin = wrote_to_primary()
+        return self.finish(response, pin)
+
+    def finish(self, response, pin):
+        if pin:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE or None,
+            )
+        return response
@@ -0,0 +1,360 @@
+"""
+Full-text search index backed by SQLite FTS5.
+
+Every searchable object is mirrored into the ``core_search_index`` virtual
+table (created by migration ``0003``) holding its title, body and tags, and
+into ``core_search_trigram`` (migration ``0007``), the same columns split
+into trigrams. ``core.signals`` keeps both in step with saves and deletes and
+``manage.py rebuild_search_index`` repopulates them from scratch.
+
+Queries are ranked with ``bm25`` (title matches weigh most) and return an
+HTML-safe snippet with the matched terms wrapped in ``<mark>``. The word index
+matches whole words and word prefixes (``djan`` finds "Django"); a query it
+finds nothing for is looked up as a substring of at least three characters
+in the trigram index (``ango`` finds "Django"), so typos and junk queries
+never scan the tables. Databases other than SQLite use the ``icontains``
+filtering search used before.
+"""
+import asyncio
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, router, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Member, Event, Achievement, BlogPost, Project, Resource
+
+
+INDEX_TABLE = 'core_search_index'
+TRIGRAM_TABLE = 'core_search_trigram'
+INDEX_TABLES = (INDEX_TABLE, TRIGRAM_TABLE)
+RESULTS_PER_KIND = 10
+
+# Relative bm25 weights for the (kind, object_id, title, body, tags) columns
+BM25_WEIGHTS = (0.0, 0.0, 10.0, 1.0, 5.0)
+
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchableModel:
+    """How one model maps onto the (title, body, tags) index columns"""
+
+    def __init__(self, kind, category, model, title, body, tags=None,
+                 queryset=None, indexable=None, lookups=(), select_related=()):
+        self.kind = kind
+        self.category = category
+        self.model = model
+        self.title = title
+        self.body = body
+        self.tags = tags
+        self._queryset = queryset
+        # The per-instance form of ``queryset``'s filter, so saves need no query
+        self.indexable = indexable
+        self.lookups = lookups
+        self.select_related = select_related
+
+    def get_queryset(self):
+        queryset = self._queryset() if self._queryset else self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        return queryset
+
+    def is_indexable(self, instance):
+        return self.indexable is None or self.indexable(instance)
+
+    def document(self, instance):
+        def value(fields):
+            if fields is None:
+                return ''
+            return ' '.join(str(getattr(instance, field) or '') for field in fields)
+        return value(self.title), value(self.body), value(self.tags)
+
+
+SEARCHABLE_MODELS = [
+    SearchableModel(
+        'members', 'members', Member,
+        title=['name'], body=['role', 'bio'],
+        lookups=['name', 'role', 'bio'],
+    ),
+    SearchableModel(
+        'events', 'events', Event,
+        title=['title'], body=['description'],
+        lookups=['title', 'description'],
+    ),
+    SearchableModel(
+        'achievements', 'achievements', Achievement,
+        title=['title'], body=['description'],
+        lookups=['title', 'description'],
+    ),
+    SearchableModel(
+        'blog_posts', 'blog', BlogPost,
+        title=['title'], body=['excerpt', 'content'], tags=['tags'],
+        queryset=lambda: BlogPost.objects.filter(status='published'),
+        indexable=lambda post: post.status == 'published',
+        lookups=['title', 'content', 'tags'],
+        select_related=['author'],
+    ),
+    SearchableModel(
+        'projects', 'projects', Project,
+        title=['title'], body=['description'], tags=['technologies'],
+        lookups=['title', 'description', 'technologies'],
+        select_related=['segment'],
+    ),
+    SearchableModel(
+        'resources', 'resources', Resource,
+        title=['title'], body=['description'], tags=['tags'],
+        lookups=['title', 'description', 'tags'],
+    ),
+]
+
+_BY_MODEL = {searchable.model: searchable for searchable in SEARCHABLE_MODELS}
+
+
+def is_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def get_searchable(model):
+    return _BY_MODEL.get(model)
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 expression.
+
+    Each word becomes a quoted prefix term, so ``djan tut`` matches documents
+    containing words starting with both "djan" and "tut".
+    """
+    tokens = _TOKEN_RE.findall(query)
+    return ' '.join('"%s"*' % token for token in tokens)
+
+
+def build_substring_expression(query):
+    """
+    FTS5 expression matching ``query`` as a substring in the trigram index.
+
+    Empty for queries under three characters, which trigrams cannot match.
+    """
+    query = query.strip()
+    if len(query) < 3:
+        return ''
+    return '"%s"' % query.replace('"', '""')
+
+
+# Index maintenance ------------------------------------------------------
+
+def index_instance(instance):
+    """Insert or refresh ``instance`` in the index (or drop it if hidden)"""
+    searchable = get_searchable(type(instance))
+    if searchable is None or not is_enabled():
+        return
+    document = searchable.document(instance) if searchable.is_indexable(instance) else None
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in INDEX_TABLES:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE kind = %s AND object_id = %s',
+                [searchable.kind, instance.pk],
+            )
+            if document is not None:
+                cursor.execute(
+                    f'INSERT INTO {table} (kind, object_id, title, body, tags) '
+                    f'VALUES (%s, %s, %s, %s, %s)',
+                    [searchable.kind, instance.pk, *document],
+                )
+
+
+def remove_instance(instance):
+    searchable = get_searchable(type(instance))
+    if searchable is None or not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        for table in INDEX_TABLES:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE kind = %s AND object_id = %s',
+                [searchable.kind, instance.pk],
+            )
+
+
+def rebuild_index(batch_size=500):
+    """Repopulate both indexes; returns the number of indexed objects"""
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in INDEX_TABLES:
+            cursor.execute(f'DELETE FROM {table}')
+        for searchable in SEARCHABLE_MODELS:
+            rows = [
+                (searchable.kind, instance.pk, *searchable.document(instance))
+                for instance in searchable.get_queryset().iterator(chunk_size=batch_size)
+            ]
+            for table in INDEX_TABLES:
+                cursor.executemany(
+                    f'INSERT INTO {table} (kind, object_id, title, body, tags) '
+                    f'VALUES (%s, %s, %s, %s, %s)',
+                    rows,
+                )
+            total += len(rows)
+        for table in INDEX_TABLES:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    return total
+
+
+# Querying ---------------------------------------------------------------
+
+def _highlight(snippet):
+    html = escape(snippet)
+    html = html.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def _ranked_hits(query, searchables, limit):
+    """Return ``{kind: [(object_id, snippet)]}``, best first: word prefixes, else substrings"""
+    for table, match in [
+        (INDEX_TABLE, build_match_expression(query)),
+        (TRIGRAM_TABLE, build_substring_expression(query)),
+    ]:
+        ranked = _index_hits(table, match, searchables, limit) if match else {}
+        if ranked:
+            return ranked
+    return {}
+
+
+def _index_hits(table, match, searchables, limit):
+    kinds = [searchable.kind for searchable in searchables]
+    placeholders = ', '.join(['%s'] * len(kinds))
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+
+    # Both indexes are plain tables; read them wherever the indexed models are read
+    with connections[router.db_for_read(searchables[0].model)].cursor() as cursor:
+        # Top ``limit`` rows per kind, best bm25 score first
+        cursor.execute(
+            f'WITH hits AS MATERIALIZED ('
+            f'  SELECT rowid, kind, object_id, bm25({table}, {weights}) AS score'
+            f'  FROM {table} WHERE {table} MATCH %s AND kind IN ({placeholders})'
+            f') '
+            f'SELECT rowid, kind, object_id FROM ('
+            f'  SELECT *, ROW_NUMBER() OVER (PARTITION BY kind ORDER BY score) AS position'
+            f'  FROM hits'
+            f') WHERE position <= %s ORDER BY kind, position',
+            [match, *kinds, limit],
+        )
+        hits = cursor.fetchall()
+        if not hits:
+            return {}
+
+        # Snippets only for the rows we are going to show
+        rowids = [hit[0] for hit in hits]
+        cursor.execute(
+            f"SELECT rowid, snippet({table}, -1, %s, %s, '…', 16) "
+            f"FROM {table} WHERE {table} MATCH %s "
+            f"AND rowid IN ({', '.join(['%s'] * len(rowids))})",
+            [_MARK_START, _MARK_END, match, *rowids],
+        )
+        snippets = dict(cursor.fetchall())
+
+    ranked = {}
+    for rowid, kind, object_id in hits:
+        ranked.setdefault(kind, []).append((int(object_id), snippets.get(rowid, '')))
+    return ranked
+
+
+def _ranked_results(searchables, ranked, objects_by_kind):
+    results = {}
+    for searchable in searchables:
+        if searchable.kind not in ranked:
+            continue
+        objects = objects_by_kind[searchable.kind]
+        found = []
+        for object_id, snippet in ranked[searchable.kind]:
+            obj = objects.get(object_id)
+            if obj is not None:
+                obj.search_snippet = _highlight(snippet)
+                found.append(obj)
+        if found:
+            results[searchable.kind] = found
+    return results
+
+
+def _search_fts(query, searchables, limit):
+    ranked = _ranked_hits(query, searchables, limit)
+    objects_by_kind = {
+        searchable.kind: searchable.get_queryset().in_bulk(
+            [object_id for object_id, _ in ranked[searchable.kind]]
+        )
+        for searchable in searchables if searchable.kind in ranked
+    }
+    return _ranked_results(searchables, ranked, objects_by_kind)
+
+
+async def _asearch_fts(query, searchables, limit):
+    # Django has no async cursor; the ranking query runs in a worker thread
+    ranked = await sync_to_async(_ranked_hits)(query, searchables, limit)
+    matched = [searchable for searchable in searchables if searchable.kind in ranked]
+    objects = await asyncio.gather(*(
+        searchable.get_queryset().ain_bulk([object_id for object_id, _ in ranked[searchable.kind]])
+        for searchable in matched
+    ))
+    objects_by_kind = {searchable.kind: found for searchable, found in zip(matched, objects)}
+    return _ranked_results(searchables, ranked, objects_by_kind)
+
+
+def _icontains_queryset(searchable, query, limit):
+    condition = Q()
+    for lookup in searchable.lookups:
+        condition |= Q(**{f'{lookup}__icontains': query})
+    return searchable.get_queryset().filter(condition)[:limit]
+
+
+def _search_icontains(query, searchables, limit):
+    results = {}
+    for searchable in searchables:
+        found = list(_icontains_queryset(searchable, query, limit))
+        if found:
+            results[searchable.kind] = found
+    return results
+
+
+async def _asearch_icontains(query, searchables, limit):
+    async def evaluate(searchable):
+        return [obj async for obj in _icontains_queryset(searchable, query, limit)]
+
+    found = await asyncio.gather(*(evaluate(searchable) for searchable in searchables))
+    return {
+        searchable.kind: objects
+        for searchable, objects in zip(searchables, found) if objects
+    }
+
+
+def _searchables(category):
+    return [
+        searchable for searchable in SEARCHABLE_MODELS
+        if category == 'all' or searchable.category == category
+    ]
+
+
+def search(query, category='all', limit=RESULTS_PER_KIND):
+    """
+    Search every model (or just ``category``) for ``query``.
+
+    Returns ``{kind: [objects]}`` with each kind's results in rank order;
+    objects found through the FTS indexes carry a ``search_snippet``.
+    """
+    searchables = _searchables(category)
+    if not searchables or not query:
+        return {}
+    if is_enabled():
+        return _search_fts(query, searchables, limit)
+    return _search_icontains(query, searchables, limit)
+
+
+async def asearch(query, category='all', limit=RESULTS_PER_KIND):
+    """Async ``search``; the per-model queries run concurrently"""
+    searchables = _searchables(category)
+    if not searchables or not query:
+        return {}
+    if is_enabled():
+        return await _asearch_fts(query, searchables, limit)
+    return await _asearch_icontains(query, searchables, limit)
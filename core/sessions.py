@@ -0,0 +1,38 @@
+"""
+Lazy session persistence.
+
+With ``SESSION_SAVE_EVERY_REQUEST`` every page view by a visitor holding a
+session cookie rewrites their ``django_session`` row, and SQLite serializes
+those writes. ``LazySessionMiddleware`` (used in place of Django's
+``SessionMiddleware``) saves a session only when it was modified, except that
+a session read by the request gets its expiry pushed forward at most once
+every ``SESSION_TOUCH_SECONDS``. Sessions nobody reads are left alone.
+
+``manage.py benchmark_sessions`` compares the number of session writes
+with the old eager behaviour.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+
+TOUCHED_KEY = '_touched_at'
+
+
+class LazySessionMiddleware(SessionMiddleware):
+    """``SessionMiddleware`` that refreshes unmodified sessions sparingly"""
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if (
+            session is not None
+            and session.accessed
+            and not session.modified
+            and settings.SESSION_COOKIE_NAME in request.COOKIES
+            and not session.is_empty()
+        ):
+            now = int(time.time())
+            if now - session.get(TOUCHED_KEY, 0) >= settings.SESSION_TOUCH_SECONDS:
+                session[TOUCHED_KEY] = now  # marks it modified, so it is saved
+        return super().process_response(request, response)
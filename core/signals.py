@@ -0,0 +1,101 @@
+"""
+Signal receivers for the core app.
+
+Connected from ``CoreConfig.ready``. Cache invalidation waits for the
+surrounding transaction to commit: a request rendering in between would
+otherwise read the old rows and store them under the new cache versions.
+"""
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from . import images, search
+from .cache_policy import model_surrogate_keys, purge_surrogate_keys
+from .db import configure_sqlite_connection
+from .models import (
+    Segment, Member, Achievement, GalleryPhoto, Event, BlogPost, FAQ, Project, Resource,
+)
+from .related import invalidate_related_items
+from .snapshots import invalidate_home_snapshot
+
+
+connection_created.connect(configure_sqlite_connection, dispatch_uid='core.configure_sqlite_connection')
+
+
+HOME_SNAPSHOT_MODELS = (Segment, BlogPost, Event, Project)
+
+
+@receiver([post_save, post_delete, images.derivatives_generated], dispatch_uid='core.invalidate_home_snapshot')
+def invalidate_home_snapshot_on_change(sender, **kwargs):
+    """Rebuild the homepage snapshot when any of its source models change"""
+    if sender in HOME_SNAPSHOT_MODELS:
+        transaction.on_commit(invalidate_home_snapshot, using=kwargs.get('using'))
+
+
+# Segments and users only appear as related rows: their versions feed the ETags
+RELATED_ITEMS_MODELS = (Member, BlogPost, Project, Segment, User)
+
+
+def is_login_save(kwargs):
+    """Every login saves the user's ``last_login``, which no page shows"""
+    return kwargs.get('update_fields') == {'last_login'}
+
+
+@receiver([post_save, post_delete, images.derivatives_generated], dispatch_uid='core.invalidate_related_items')
+def invalidate_related_items_on_change(sender, **kwargs):
+    """Retire cached related-item lists (and ETags) built from ``sender``"""
+    if sender in RELATED_ITEMS_MODELS and not is_login_save(kwargs):
+        transaction.on_commit(partial(invalidate_related_items, sender), using=kwargs.get('using'))
+
+
+@receiver(m2m_changed, dispatch_uid='core.invalidate_related_items_m2m')
+def invalidate_related_items_on_m2m_change(sender, instance, action, **kwargs):
+    if action.startswith('post_') and type(instance) in RELATED_ITEMS_MODELS:
+        transaction.on_commit(partial(invalidate_related_items, type(instance)), using=kwargs.get('using'))
+
+
+# Models rendered on cached pages (users as post authors); forms submissions and tasks are not
+PAGE_MODELS = (Segment, Member, Achievement, GalleryPhoto, Event, BlogPost, FAQ, Project, Resource, User)
+
+
+def purge_on_commit(instance, using=None):
+    # Keys are taken now: a deleted instance loses its pk before the commit
+    keys = model_surrogate_keys(instance)
+    transaction.on_commit(partial(purge_surrogate_keys, *keys), using=using)
+
+
+@receiver([post_save, post_delete, images.derivatives_generated], dispatch_uid='core.purge_page_cache')
+def purge_page_cache_on_change(sender, instance, **kwargs):
+    """Purge cached pages tagged with the changed object or its model's lists"""
+    if sender in PAGE_MODELS and not is_login_save(kwargs):
+        purge_on_commit(instance, kwargs.get('using'))
+
+
+@receiver(m2m_changed, dispatch_uid='core.purge_page_cache_m2m')
+def purge_page_cache_on_m2m_change(sender, instance, **kwargs):
+    if type(instance) in PAGE_MODELS:
+        purge_on_commit(instance, kwargs.get('using'))
+
+
+@receiver(post_save, dispatch_uid='core.queue_image_processing')
+def queue_image_processing(sender, instance, raw=False, **kwargs):
+    """Queue re-encoding and resized copies of newly uploaded images"""
+    if not raw and sender in images.IMAGE_FIELDS:
+        images.queue_processing(instance)
+
+
+@receiver(post_save, dispatch_uid='core.update_search_index')
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Keep the full-text search index in step with searchable models"""
+    if not raw and search.get_searchable(sender) is not None:
+        search.index_instance(instance)
+
+
+@receiver(post_delete, dispatch_uid='core.remove_from_search_index')
+def remove_from_search_index(sender, instance, **kwargs):
+    if search.get_searchable(sender) is not None:
+        search.remove_instance(instance)
@@ -0,0 +1,146 @@
+"""
+Precomputed homepage snapshot.
+
+The homepage is the hottest URL on the site and its content only changes when
+an admin edits a Segment, BlogPost, Event or Project. Instead of querying and
+re-rendering it on every request, the rendered HTML and the evaluated context
+are kept in process memory and rebuilt only after one of those models changes
+(see ``core.signals``).
+
+Invalidation is shared between worker processes through a version number
+stored in the default cache; each process re-checks it at most every
+``HOME_SNAPSHOT_CHECK_SECONDS`` seconds so the common path never leaves memory.
+
+``aget_home_snapshot`` is the variant used by the async homepage view.
+"""
+import asyncio
+import copy
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import QueryDict
+from django.template.loader import render_to_string
+
+from .models import Segment, BlogPost, Event, Project
+
+
+HOME_SNAPSHOT_VERSION_KEY = 'core:home_snapshot:version'
+HOME_TEMPLATE = 'core/home.html'
+
+_lock = threading.Lock()
+_snapshots = {}
+_version = {'value': None, 'checked_at': 0.0}
+
+
+def get_home_context():
+    """Evaluate the homepage querysets into plain lists"""
+    return {
+        'segments': list(Segment.objects.all()[:6]),  # Show first 6 segments
+        'recent_news': list(BlogPost.objects.filter(status='published')[:3]),
+        'upcoming_events': list(Event.objects.filter(status='upcoming')[:3]),
+        'featured_projects': list(Project.objects.filter(status='completed')[:3]),
+        'page_title': 'NITER Computer Club',
+    }
+
+
+async def aget_home_context():
+    """``get_home_context`` with the four queries issued concurrently"""
+    async def evaluate(queryset):
+        return [obj async for obj in queryset]
+
+    segments, recent_news, upcoming_events, featured_projects = await asyncio.gather(
+        evaluate(Segment.objects.all()[:6]),
+        evaluate(BlogPost.objects.filter(status='published')[:3]),
+        evaluate(Event.objects.filter(status='upcoming')[:3]),
+        evaluate(Project.objects.filter(status='completed')[:3]),
+    )
+    return {
+        'segments': segments,
+        'recent_news': recent_news,
+        'upcoming_events': upcoming_events,
+        'featured_projects': featured_projects,
+        'page_title': 'NITER Computer Club',
+    }
+
+
+def _version_is_current():
+    interval = getattr(settings, 'HOME_SNAPSHOT_CHECK_SECONDS', 5)
+    return _version['value'] is not None and time.monotonic() - _version['checked_at'] < interval
+
+
+def _shared_version():
+    """Return the cluster-wide snapshot version, re-reading it periodically"""
+    if not _version_is_current():
+        _version['value'] = cache.get_or_set(HOME_SNAPSHOT_VERSION_KEY, 1, None)
+        _version['checked_at'] = time.monotonic()
+    return _version['value']
+
+
+def _canonical_request(request):
+    """Anonymous copy of ``request`` without its query string (utm_* and friends)"""
+    canonical = copy.copy(request)
+    canonical.GET = QueryDict(mutable=False)
+    canonical.META = dict(request.META, QUERY_STRING='')
+    canonical.user = AnonymousUser()
+    return canonical
+
+
+def get_home_snapshot(request):
+    """
+    Return ``(html, context)`` for the homepage.
+
+    The HTML is rendered for an anonymous visitor; callers must re-render
+    ``context`` for staff users. Snapshots are keyed by scheme and host
+    because ``base.html`` renders absolute URLs.
+    """
+    version = _shared_version()
+    host = request.build_absolute_uri('/')
+    snapshot = _snapshots.get(host)
+    if snapshot is not None and snapshot[0] == version:
+        return snapshot[1], snapshot[2]
+
+    with _lock:
+        snapshot = _snapshots.get(host)
+        if snapshot is None or snapshot[0] != version:
+            context = get_home_context()
+            canonical = _canonical_request(request)
+            html = render_to_string(HOME_TEMPLATE, context, request=canonical)
+            snapshot = (version, html, context)
+            _snapshots[host] = snapshot
+    return snapshot[1], snapshot[2]
+
+
+async def aget_home_snapshot(request):
+    """Async ``get_home_snapshot``; the event loop only waits on I/O"""
+    if _version_is_current():
+        version = _version['value']
+    else:
+        version = await sync_to_async(_shared_version)()
+    host = request.build_absolute_uri('/')
+    snapshot = _snapshots.get(host)
+    if snapshot is not None and snapshot[0] == version:
+        return snapshot[1], snapshot[2]
+
+    # Concurrent rebuilds are harmless: the last one wins
+    context = await aget_home_context()
+    html = await sync_to_async(render_to_string)(
+        HOME_TEMPLATE, context, request=_canonical_request(request),
+    )
+    _snapshots[host] = (version, html, context)
+    return html, context
+
+
+def invalidate_home_snapshot():
+    """Drop local snapshots and bump the shared version for other processes"""
+    with _lock:
+        _snapshots.clear()
+        try:
+            _version['value'] = cache.incr(HOME_SNAPSHOT_VERSION_KEY)
+        except ValueError:
+            cache.set(HOME_SNAPSHOT_VERSION_KEY, 2, None)
+            _version['value'] = 2
+        _version['checked_at'] = time.monotonic()
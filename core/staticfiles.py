@@ -0,0 +1,236 @@
+"""
+Fingerprinted, precompressed static files served in-process.
+
+``CompressedManifestStaticFilesStorage`` is the ``collectstatic`` backend: on
+top of Django's content-hashed names and ``staticfiles.json`` manifest it
+writes a ``.gz`` (and, if the ``brotli`` package is installed, a ``.br``)
+sibling of every text asset that compression makes smaller.
+
+``StaticFilesMiddleware`` answers requests under ``STATIC_URL`` from
+``STATIC_ROOT`` before the rest of the middleware stack runs, WhiteNoise
+style. List it directly after ``SecurityMiddleware``, so static files still
+get HTTPS redirects and security headers:
+
+* hashed names are sent with ``Cache-Control: immutable`` and a one-year
+  ``max-age``, so browsers never revalidate them; other files get
+  ``STATIC_MAX_AGE``;
+* the smallest precompressed variant the client accepts is chosen, with
+  ``Vary: Accept-Encoding``;
+* under WSGI the file object is handed to the server's ``wsgi.file_wrapper``,
+  which gunicorn and uWSGI turn into a zero-copy ``sendfile``.
+
+``STATIC_ROOT`` is scanned once, when the first static request arrives, so
+run ``collectstatic`` before starting the server.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+from .conditional import not_modified_response
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.svg', '.json', '.map', '.txt', '.xml', '.html', '.ico')
+COMPRESS_MIN_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Preferred first; the file suffix written by the storage for each coding
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def compress(content):
+    """``{suffix: bytes}`` for each compressed variant smaller than ``content``"""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Content-hashed static files with precompressed siblings (see module docstring)"""
+    _warned_no_manifest = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = {*paths, *self.hashed_files.values()}
+        for name in sorted(names):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+                continue
+            with self.open(name) as f:
+                content = f.read()
+            if len(content) < COMPRESS_MIN_SIZE:
+                continue
+            for suffix, data in compress(content).items():
+                compressed_name = name + suffix
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(data))
+                yield name, compressed_name, True
+
+    def stored_name(self, name):
+        # Before the first collectstatic (development, tests) there is no
+        # manifest to look names up in; fall back to the unhashed name, which
+        # is served without the immutable caching headers
+        if not self.hashed_files:
+            if not self._warned_no_manifest:
+                logger.warning(
+                    'No static files manifest at %s; serving unhashed names. '
+                    'Run "manage.py collectstatic".', self.path(self.manifest_name),
+                )
+                self._warned_no_manifest = True
+            return name
+        return super().stored_name(name)
+
+
+class StaticFile:
+    """One file under ``STATIC_ROOT`` and its precompressed variants"""
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else f'public, max-age={settings.STATIC_MAX_AGE}'
+        # (encoding, path, etag), best first; the identity variant always last
+        self.variants = [
+            (encoding, path + suffix, self._etag(path + suffix))
+            for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)
+        ]
+        self.variants.append((None, path, self._etag(path)))
+
+    @staticmethod
+    def _etag(path):
+        stat = os.stat(path)
+        return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+    def choose(self, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, path, etag in self.variants:
+            if encoding is None or encoding in accepted:
+                return encoding, path, etag
+
+    def headers(self, encoding, etag):
+        headers = {
+            'Cache-Control': self.cache_control,
+            'ETag': etag,
+            'Last-Modified': http_date(self.last_modified.timestamp()),
+            'X-Content-Type-Options': 'nosniff',
+        }
+        if len(self.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return headers
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def scan_static_root():
+    """``{url path: StaticFile}`` for everything ``collectstatic`` wrote"""
+    root = str(settings.STATIC_ROOT)
+    prefix = '/' + settings.STATIC_URL.lstrip('/')
+    manifest = getattr(staticfiles_storage, 'hashed_files', {})
+    hashed = set(manifest.values())
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[prefix + name] = StaticFile(path, immutable=name in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files in-process (see module docstring)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self._files = None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @property
+    def files(self):
+        if self._files is None:
+            self._files = scan_static_root()
+        return self._files
+
+    def find(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.find(request)
+        if static_file is None:
+            return self.get_response(request)
+        return self.serve(request, static_file)
+
+    async def __acall__(self, request):
+        static_file = self.find(request)
+        if static_file is None:
+            return await self.get_response(request)
+        return self.serve(request, static_file, asynchronous=True)
+
+    def serve(self, request, static_file, asynchronous=False):
+        encoding, path, etag = static_file.choose(request.headers.get('Accept-Encoding', ''))
+        headers = static_file.headers(encoding, etag)
+        response = not_modified_response(request, etag, static_file.last_modified)
+        if response is None:
+            if asynchronous:
+                # ASGI has no sendfile; stream without blocking the event loop
+                response = StreamingHttpResponse(_aread(path), content_type=static_file.content_type)
+                response['Content-Length'] = str(os.path.getsize(path))
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+                del response['Content-Disposition']
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+
+async def _aread(path, block_size=64 * 1024):
+    f = await sync_to_async(open)(path, 'rb')
+    try:
+        while chunk := await sync_to_async(f.read)(block_size):
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,148 @@
+"""
+A small database-backed task queue.
+
+Work that is too slow for a request (image processing, mostly) is stored as a
+``Task`` row and run by ``manage.py run_worker``. No broker is needed: the
+row is written in the same transaction as the change that caused it, and
+workers claim rows with a conditional ``UPDATE`` so several of them can run
+side by side.
+
+Register a function with ``@task('name')``; it is called as
+``func(task, *args)`` and may report progress with ``task_progress``. A task
+that raises is retried after ``TASK_RETRY_DELAY * 2 ** (attempts - 1)``
+seconds, up to ``max_attempts`` times. ``TASK_ALWAYS_EAGER`` runs tasks
+inline instead, for development without a worker.
+"""
+import hashlib
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register the decorated function as the task ``name``"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def task_key(name, args):
+    key = f'{name}:{":".join(map(str, args))}'
+    if len(key) > 255:
+        key = f'{name}:{hashlib.sha1(key.encode()).hexdigest()}'
+    return key
+
+
+def enqueue(name, *args, max_attempts=3):
+    """
+    Queue ``name(*args)``, unless the same call is already waiting.
+
+    Returns the ``Task``; with ``TASK_ALWAYS_EAGER`` it has already run.
+    """
+    if name not in _registry:
+        raise KeyError(f'Unknown task {name!r}')
+    key = task_key(name, args)
+    existing = Task.objects.filter(key=key, status='pending').first()
+    if existing is not None:
+        return existing
+    queued = Task.objects.create(name=name, args=list(args), key=key, max_attempts=max_attempts)
+    if settings.TASK_ALWAYS_EAGER:
+        queued.status, queued.attempts = 'running', 1
+        Task.objects.filter(pk=queued.pk).update(status='running', attempts=1, started_at=timezone.now())
+        run_task(queued)
+    return queued
+
+
+def task_progress(queued, done, total, message=''):
+    """Record that ``done`` of ``total`` steps of ``queued`` are finished"""
+    queued.progress = min(100, round(100 * done / total)) if total else 100
+    queued.progress_message = message[:255]
+    Task.objects.filter(pk=queued.pk).update(
+        progress=queued.progress, progress_message=queued.progress_message, updated_at=timezone.now(),
+    )
+
+
+def claim_task():
+    """
+    Mark the next runnable task as running and return it, or None.
+
+    ``updated_at`` is the heartbeat of a running task: ``task_progress``
+    bumps it. Tasks that have not reported for ``TASK_TIMEOUT`` (their
+    worker died) are picked up again, which counts as another attempt; one
+    that has already used up ``max_attempts`` is marked failed instead, so
+    a task that kills its worker cannot be retried forever.
+    """
+    now = timezone.now()
+    stale = Q(status='running', updated_at__lt=now - timedelta(seconds=settings.TASK_TIMEOUT))
+    Task.objects.filter(stale, attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, updated_at=now,
+        last_error='The worker running this task stopped responding.',
+    )
+    runnable = Q(status='pending', run_after__lte=now) | stale
+    for candidate in Task.objects.filter(runnable).order_by('run_after', 'id')[:10]:
+        claimed = Task.objects.filter(
+            pk=candidate.pk, status=candidate.status, updated_at=candidate.updated_at,
+        ).update(
+            status='running', attempts=F('attempts') + 1, started_at=now,
+            progress=0, progress_message='', updated_at=now,
+        )
+        if claimed:
+            candidate.status, candidate.started_at, candidate.updated_at = 'running', now, now
+            candidate.attempts += 1
+            return candidate
+    return None
+
+
+def run_task(queued):
+    """Run a task claimed by ``claim_task`` and record its outcome; returns True on success"""
+    try:
+        _registry[queued.name](queued, *queued.args)
+    except Exception:
+        queued.last_error = traceback.format_exc()
+        now = timezone.now()
+        if queued.attempts < queued.max_attempts:
+            queued.status = 'pending'
+            queued.run_after = now + timedelta(seconds=settings.TASK_RETRY_DELAY * 2 ** (queued.attempts - 1))
+            logger.warning('Task %s failed (attempt %d), retrying', queued, queued.attempts, exc_info=True)
+        else:
+            queued.status = 'failed'
+            queued.finished_at = now
+            logger.exception('Task %s failed after %d attempts', queued, queued.attempts)
+        queued.save(update_fields=['status', 'run_after', 'finished_at', 'last_error', 'updated_at'])
+        return False
+    queued.status = 'done'
+    queued.progress = 100
+    queued.finished_at = timezone.now()
+    queued.save(update_fields=['status', 'progress', 'finished_at', 'updated_at'])
+    return True
+
+
+def run_pending(limit=None):
+    """Run runnable tasks until none are left (or ``limit`` ran); returns the count"""
+    count = 0
+    while limit is None or count < limit:
+        queued = claim_task()
+        if queued is None:
+            break
+        run_task(queued)
+        count += 1
+    return count
+
+
+def retry(queryset):
+    """Queue failed tasks in ``queryset`` again, with a fresh set of attempts"""
+    return queryset.filter(status='failed').update(
+        status='pending', attempts=0, run_after=timezone.now(), finished_at=None, progress=0,
+    )
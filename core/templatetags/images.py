@@ -0,0 +1,48 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from .. import images
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(fieldfile, sizes='100vw', **attrs):
+    """
+    ``<picture>`` for an uploaded image with AVIF/WebP sources and a fallback
+    ``srcset``; extra keyword arguments become ``<img>`` attributes, except
+    ``picture_class`` which is set on the ``<picture>`` element.
+
+        {% responsive_image photo.image sizes="(min-width: 992px) 33vw, 100vw" alt=photo.title %}
+    """
+    if not fieldfile:
+        return ''
+    picture_class = attrs.pop('picture_class', '')
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    manifest = images.get_manifest(fieldfile)
+    if not manifest or not manifest['widths']:
+        return format_html('<img src="{}"{}>', fieldfile.url, flatatt(attrs))
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (images.MIME_TYPES[extension], images.srcset(fieldfile, manifest, extension), sizes)
+            for extension in manifest['formats']
+        ),
+    )
+    fallback_srcset = images.srcset(fieldfile, manifest, manifest['fallback'])
+    fallback_srcset += f', {fieldfile.url} {manifest["width"]}w'
+    return format_html(
+        '<picture{}>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}"{}></picture>',
+        flatatt({'class': picture_class} if picture_class else {}), sources, fieldfile.url, fallback_srcset, sizes,
+        manifest['width'], manifest['height'], flatatt(attrs),
+    )
+
+
+@register.simple_tag
+def thumbnail_url(fieldfile, size):
+    """URL of a fixed-size thumbnail (``IMAGE_THUMBNAIL_SIZES``), or the original"""
+    return images.thumbnail_url(fieldfile, size)
@@ -0,0 +1,35 @@
+"""
+Test helpers for the core app.
+
+``QueryBudgetMixin`` lets a ``TestCase`` enforce an upper bound on the number
+of SQL queries a view runs::
+
+    class MemberViewTests(QueryBudgetMixin, TestCase):
+        def test_members(self):
+            self.assertQueryBudget(reverse('core:members'), 4)
+
+Budgets are asserted against a cleared cache so page-cache hits cannot hide
+regressions; failures list every captured statement.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+
+    def assertQueryBudget(self, url, budget, method='get', **kwargs):
+        """Request ``url`` and fail if it runs more than ``budget`` queries"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, **kwargs)
+        executed = len(context.captured_queries)
+        if executed > budget:
+            statements = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{url} ran {executed} queries, over its budget of {budget}:\n{statements}'
+            )
+        return response
@@ -1,3 +1,1515 @@
-from django.test import TestCase
+import gzip
+import io
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, TestCase, override_settings, skipUnlessDBFeature
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Segment, Member, Achievement, GalleryPhoto, Event, ContactSubmission,
+    BlogPost, FAQ, Project, Resource, MembershipApplication, Newsletter, Task
+)
+from . import counters, css, dashboard, images, search, tasks, views
+from .cache_backends import TieredCache
+from .cache_policy import CachePolicy, purge_surrogate_keys
+from .db import pragma_statements
+from .pagination import CursorPaginator, encode_cursor
+from .management.commands.benchmark_sessions import is_session_write
+from .middleware import get_query_report, reset_query_report
+from .routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware, request_routing
+from .snapshots import HOME_SNAPSHOT_VERSION_KEY, get_home_snapshot, invalidate_home_snapshot
+from .staticfiles import CompressedManifestStaticFilesStorage
+from .testing import QueryBudgetMixin
+
+
+def create_site_content(count):
+    """``count`` rows of every public model, with their relations filled in"""
+    for i in range(count):
+        author = User.objects.create(username=f'writer{i}')
+        segment = Segment.objects.create(title=f'Segment {i}', description='Segment')
+        member = Member.objects.create(name=f'Member {i}', role='Member', segment=segment)
+        Achievement.objects.create(title=f'Achievement {i}', date=timezone.now(), description='Won')
+        GalleryPhoto.objects.create(image='gallery/photo.jpg', caption=f'Photo {i}')
+        Event.objects.create(title=f'Event {i}', description='Event', date=timezone.now())
+        BlogPost.objects.create(
+            title=f'Post {i}', slug=f'post-{i}', content='Content', excerpt='Excerpt',
+            author=author, status='published', published_at=timezone.now(),
+        )
+        project = Project.objects.create(
+            title=f'Project {i}', description='Project', technologies='Python',
+            segment=segment, status='completed',
+        )
+        project.team_members.add(member)
+        Resource.objects.create(
+            title=f'Resource {i}', description='Resource', external_url='https://example.com',
+            is_featured=True,
+        )
+        FAQ.objects.create(question=f'Question {i}?', answer='Answer')
+
+
+class HomeSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(2)
+
+    def setUp(self):
+        cache.clear()
+        invalidate_home_snapshot()
+        self.request = RequestFactory().get('/')
+
+    def test_snapshot_is_reused_until_content_changes(self):
+        html, _ = get_home_snapshot(self.request)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_home_snapshot(self.request)[0], html)
+
+        segment = Segment.objects.first()
+        segment.title = 'Competitive Programming'
+        with self.captureOnCommitCallbacks(execute=True):
+            segment.save()
+        with self.assertNumQueries(4):
+            html, context = get_home_snapshot(self.request)
+        self.assertIn('Competitive Programming', html)
+        self.assertIn(segment, context['segments'])
+
+    def test_homepage_shows_new_content(self):
+        self.assertNotContains(self.client.get(reverse('core:home')), 'Robotics')
+        with self.captureOnCommitCallbacks(execute=True):
+            Segment.objects.create(title='Robotics', description='Segment')
+        self.assertContains(self.client.get(reverse('core:home')), 'Robotics')
+
+    @override_settings(HOME_SNAPSHOT_CHECK_SECONDS=0)
+    def test_invalidation_by_another_process_is_picked_up(self):
+        get_home_snapshot(self.request)
+        Segment.objects.filter(title='Segment 0').update(title='Renamed elsewhere')  # no signals, as in another process
+        self.assertNotIn('Renamed elsewhere', get_home_snapshot(self.request)[0])
+        cache.incr(HOME_SNAPSHOT_VERSION_KEY)  # what invalidate_home_snapshot does there
+        self.assertIn('Renamed elsewhere', get_home_snapshot(self.request)[0])
+
+
+class DashboardStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(3)
+        ContactSubmission.objects.create(name='A', email='a@example.com', message='Hi')
+        ContactSubmission.objects.create(name='B', email='b@example.com', message='Hi', is_read=True)
+        Newsletter.objects.create(email='on@example.com')
+        Newsletter.objects.create(email='off@example.com', is_active=False)
+        BlogPost.objects.filter(slug='post-0').update(status='draft')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_counts_match_the_data(self):
+        expected = {
+            name: queryset().count() for name, queryset in dashboard.COUNTERS.items()
+        }
+        self.assertEqual(expected['blog_posts_count'], 3)
+        self.assertEqual(expected['contact_submissions'], 1)
+        self.assertEqual(expected['newsletter_subscribers'], 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(dashboard.compute_dashboard_stats(), expected)
+
+    def test_stats_are_cached_between_requests(self):
+        url = reverse('core:admin_dashboard_stats')
+        self.client.get(url)
+        with self.assertNumQueries(1):  # loading the user; nothing is counted
+            response = self.client.get(url)
+        self.assertEqual(response.json()['segments_count'], 3)
+
+    def test_stats_endpoint_is_never_cached(self):
+        url = reverse('core:admin_dashboard_stats')
+        response = self.client.get(url)
+        for directive in ['no-cache', 'no-store', 'private']:
+            self.assertIn(directive, response['Cache-Control'])
+        self.assertNotIn('X-Page-Cache', response)
+
+        Segment.objects.create(title='New segment', description='Segment')
+        cache.delete(dashboard.DASHBOARD_STATS_KEY)  # as when the timeout runs out
+        self.assertEqual(self.client.get(url).json()['segments_count'], 4)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class ListingIndexTests(TestCase):
+    """The listing queries behind the public views must be index-driven"""
+
+    def setUp(self):
+        cache.clear()
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.query_plan(queryset)
+        self.assertIn(f'INDEX {index_name}', plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    @skipUnlessDBFeature('supports_explaining_query_execution')
+    def test_listing_queries_use_composite_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN output is SQLite-specific')
+
+        cases = [
+            (BlogPost.objects.filter(status='published').order_by('-published_at', 'id'),
+             'blogpost_status_published_idx'),
+            (Event.objects.filter(status='upcoming'), 'event_status_date_idx'),
+            (Project.objects.filter(status='completed'), 'project_status_created_idx'),
+            (Project.objects.filter(segment_id=1), 'project_segment_created_idx'),
+            (Achievement.objects.filter(category='competition'), 'achievement_category_date_idx'),
+            (GalleryPhoto.objects.order_by('-uploaded_at', 'id'), 'gallery_uploaded_idx'),
+            (GalleryPhoto.objects.filter(category='event').order_by('-uploaded_at', 'id'),
+             'gallery_category_uploaded_idx'),
+            (FAQ.objects.filter(is_active=True).order_by('order', 'question'),
+             'faq_active_order_idx'),
+            (Resource.objects.all(), 'resource_featured_created_idx'),
+            (Resource.objects.filter(is_featured=True), 'resource_featured_created_idx'),
+            (ContactSubmission.objects.filter(is_read=False), 'contact_unread_created_idx'),
+        ]
+        for queryset, index_name in cases:
+            with self.subTest(index=index_name, query=str(queryset.query)):
+                self.assertUsesIndex(queryset, index_name)
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Changelist pages must not issue one query per row"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin:index'))  # first request refreshes the session
+
+    def create_rows(self, start, count):
+        for i in range(start, start + count):
+            segment = Segment.objects.create(title=f'Segment {i}', description='Segment')
+            Member.objects.create(name=f'Member {i}', role='Member', segment=segment)
+            Project.objects.create(
+                title=f'Project {i}', description='Project', technologies='Python',
+                segment=segment,
+            )
+            author = User.objects.create(username=f'author{i}')
+            BlogPost.objects.create(
+                title=f'Post {i}', slug=f'post-{i}', content='Content', excerpt='Excerpt',
+                author=author, status='published', published_at=timezone.now(),
+            )
+            MembershipApplication.objects.create(
+                full_name=f'Applicant {i}', email=f'applicant{i}@example.com',
+                department='CSE', year_of_study='1st', interested_segment=segment,
+                programming_languages='Python', experience_level='Beginner',
+                motivation='Motivation', expectations='Expectations',
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_query_count_is_constant(self):
+        urls = [
+            reverse('admin:core_segment_changelist'),
+            reverse('admin:core_member_changelist'),
+            reverse('admin:core_project_changelist'),
+            reverse('admin:core_blogpost_changelist'),
+            reverse('admin:core_membershipapplication_changelist'),
+        ]
+        self.create_rows(0, 2)
+        baseline = {url: self.count_queries(url) for url in urls}
+        self.create_rows(2, 8)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), baseline[url])
+
+    def test_segment_member_count_is_sortable(self):
+        small = Segment.objects.create(title='Small', description='Segment')
+        large = Segment.objects.create(title='Large', description='Segment')
+        Member.objects.create(name='A', role='Member', segment=large)
+        Member.objects.create(name='B', role='Member', segment=large)
+        Member.objects.create(name='C', role='Member', segment=small)
+
+        # member_count is the fifth list_display column
+        response = self.client.get(reverse('admin:core_segment_changelist') + '?o=-5')
+        segments = list(response.context['cl'].result_list)
+        self.assertEqual(segments[0], large)
+        self.assertEqual(segments[0]._member_count, 2)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Per-view query budgets, measured with a page's worth of content"""
+
+    # List views include the MAX(updated_at)/COUNT validator query
+    QUERY_BUDGETS = {
+        'core:home': 4,
+        'core:about': 0,
+        'core:members': 4,
+        'core:achievements': 3,
+        'core:gallery': 2,
+        'core:events': 3,
+        'core:blog': 2,
+        'core:projects': 4,
+        'core:resources': 4,
+        'core:faq': 3,
+        'core:contact': 0,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(10)
+
+    def test_public_views_stay_within_budget(self):
+        for url_name, budget in self.QUERY_BUDGETS.items():
+            with self.subTest(view=url_name):
+                response = self.assertQueryBudget(reverse(url_name), budget)
+                self.assertEqual(response.status_code, 200)
+
+    def test_detail_views_stay_within_budget(self):
+        project = Project.objects.first()
+        post = BlogPost.objects.first()
+        event = Event.objects.first()
+        self.assertQueryBudget(reverse('core:project_detail', args=[project.pk]), 3)
+        self.assertQueryBudget(reverse('core:blog_detail', args=[post.slug]), 2)
+        self.assertQueryBudget(reverse('core:event_detail', args=[event.pk]), 1)
+
+    def test_search_stays_within_budget(self):
+        self.assertQueryBudget(reverse('core:search') + '?query=post', 3)
+
+    def test_budget_failure_lists_queries(self):
+        with self.assertRaisesMessage(AssertionError, 'over its budget of 0'):
+            self.assertQueryBudget(reverse('core:faq'), 0)
+
+
+class QueryCountMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_query_report()
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        FAQ.objects.create(question='Question?', answer='Answer')
+        response = self.client.get(reverse('core:faq'))
+        self.assertEqual(response['X-Query-Count'], '3')
+        self.assertIn('X-Query-Time-Ms', response)
+        self.assertIn('X-Slowest-Query-Ms', response)
+
+    def test_report_aggregates_per_url_name(self):
+        FAQ.objects.create(question='Question?', answer='Answer')
+        self.client.get(reverse('core:faq'))
+        self.client.get(reverse('core:faq'))  # served from the page cache
+        self.assertNotIn('X-Query-Count', self.client.get(reverse('core:about')))
+
+        report = get_query_report()
+        self.assertEqual(report['core:faq']['requests'], 2)
+        self.assertEqual(report['core:faq']['max_queries'], 3)
+        self.assertIn('core_faq', report['core:faq']['slowest_sql'])
+        self.assertEqual(report['core:about']['queries'], 0)
+
+
+class ContentDetailViewTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(4)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_related_items_are_cached_until_the_model_changes(self):
+        post = BlogPost.objects.get(slug='post-0')
+        url = reverse('core:blog_detail', args=[post.slug])
+        self.client.get(url)
+
+        # A new query string misses the page cache but the related list is cached
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data={'v': 1})
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('Renamed', [p.title for p in response.context['related_posts']])
+
+        other = BlogPost.objects.get(slug='post-1')
+        other.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        response = self.client.get(url, data={'v': 2})
+        self.assertIn('Renamed', [p.title for p in response.context['related_posts']])
+
+    def test_detail_pages_send_validators(self):
+        project = Project.objects.first()
+        response = self.client.get(reverse('core:project_detail', args=[project.pk]))
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        if not search.is_enabled():
+            self.skipTest('The full-text index is SQLite-only')
+        self.author = User.objects.create(username='writer')
+
+    def create_project(self, title, description='A project', technologies='Python'):
+        return Project.objects.create(title=title, description=description, technologies=technologies)
+
+    def found(self, query, kind='projects'):
+        return [obj.title for obj in search.search(query).get(kind, [])]
+
+    def test_title_matches_rank_first(self):
+        self.create_project('Scheduler', description='Built with django and celery')
+        self.create_project('Django blog engine')
+        self.create_project('Ledger', technologies='Django')
+        self.assertEqual(self.found('django'), ['Django blog engine', 'Ledger', 'Scheduler'])
+
+    def test_words_match_by_prefix(self):
+        self.create_project('Django blog engine')
+        self.assertEqual(self.found('djan eng'), ['Django blog engine'])
+        self.assertEqual(self.found('blog djangoo'), [])
+
+    def test_infix_queries_use_the_trigram_index(self):
+        project = self.create_project('Django blog engine')
+        self.assertEqual(self.found('ango'), ['Django blog engine'])
+        self.assertEqual(self.found('o blog e'), ['Django blog engine'])
+        self.assertIn('<mark>ango</mark>', search.search('ango')['projects'][0].search_snippet)
+        self.assertEqual(search.search('django')['projects'][0].pk, project.pk)
+        self.assertEqual(self.found('an'), [])  # too short for trigrams
+
+    def test_unmatched_queries_do_not_scan_the_tables(self):
+        self.create_project('Django blog engine', description='A long description')
+        for query in ['djangp', 'qwertyuiop', 'x']:
+            with self.subTest(query=query), CaptureQueriesContext(connection) as context:
+                self.assertEqual(search.search(query), {})
+            self.assertFalse([q for q in context.captured_queries if 'LIKE' in q['sql']])
+
+    def test_query_syntax_and_markup_are_escaped(self):
+        self.create_project('Parser', description='Escapes <script>alert(1)</script> in django templates')
+        for query in ['"', 'django"', 'NOT django', 'NEAR(django', 'title:django', '*', 'AND OR', '-django']:
+            with self.subTest(query=query):
+                search.search(query)  # must not raise an FTS5 syntax error
+        snippet = search.search('django')['projects'][0].search_snippet
+        self.assertIn('&lt;script&gt;', snippet)
+        self.assertIn('<mark>django</mark>', snippet)
+        self.assertNotIn('<script>', snippet)
+
+    def test_index_follows_saves_and_deletes(self):
+        project = self.create_project('Compiler')
+        self.assertEqual(self.found('compiler'), ['Compiler'])
+        project.title = 'Interpreter'
+        project.save()
+        self.assertEqual(self.found('compiler'), [])
+        self.assertEqual(self.found('interpreter'), ['Interpreter'])
+        project.delete()
+        self.assertEqual(self.found('interpreter'), [])
+
+    def test_only_published_posts_are_indexed_without_extra_queries(self):
+        post = BlogPost.objects.create(
+            title='Release notes', slug='release-notes', content='Content', excerpt='Excerpt',
+            author=self.author, status='draft',
+        )
+        self.assertEqual(self.found('release', 'blog_posts'), [])
+        post.status = 'published'
+        with CaptureQueriesContext(connection) as context:
+            post.save()
+        self.assertFalse([q for q in context.captured_queries if q['sql'].startswith('SELECT')])
+        self.assertEqual(self.found('release', 'blog_posts'), ['Release notes'])
+
+    def test_migration_indexes_existing_rows(self):
+        self.create_project('Compiler')
+        BlogPost.objects.create(
+            title='Draft', slug='draft', content='Content', excerpt='Excerpt', author=self.author,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.INDEX_TABLE}')
+        migration = import_module('core.migrations.0003_search_index')
+        migration.populate_search_index(django_apps, mock.Mock(connection=connection))
+        self.assertEqual(self.found('compiler'), ['Compiler'])
+        self.assertEqual(self.found('draft', 'blog_posts'), [])
+
+    def test_trigram_migration_copies_the_word_index(self):
+        self.create_project('Compiler')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {search.TRIGRAM_TABLE}')
+            schema_editor = mock.Mock(connection=connection, execute=cursor.execute)
+            migration = import_module('core.migrations.0007_search_trigram_index')
+            migration.create_trigram_index(django_apps, schema_editor)
+        self.assertEqual(self.found('mpil'), ['Compiler'])
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(3)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response, **extra):
+        cache.clear()  # make the view itself answer, not the page cache
+        with CaptureQueriesContext(connection) as context:
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **extra)
+        return again, len(context.captured_queries)
+
+    def test_list_views_answer_304_with_one_query(self):
+        for url_name in ['core:members', 'core:gallery', 'core:blog', 'core:projects', 'core:faq']:
+            with self.subTest(view=url_name):
+                url = reverse(url_name)
+                response = self.client.get(url)
+                self.assertIn('ETag', response)
+                again, queries = self.revalidate(url, response)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again.content, b'')
+                self.assertEqual(queries, 1)
+
+    def test_list_etag_changes_with_content(self):
+        url = reverse('core:events')
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+
+        event = Event.objects.first()
+        event.title = 'Renamed'
+        event.save()
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+
+        # Deleting a row does not raise MAX(updated_at) but changes the count
+        Event.objects.exclude(pk=event.pk).first().delete()
+        third, _ = self.revalidate(url, again)
+        self.assertEqual(third.status_code, 200)
+
+    def test_gallery_etag_changes_when_a_photo_is_edited(self):
+        url = reverse('core:gallery')
+        response = self.client.get(url)
+        photo = GalleryPhoto.objects.first()
+        photo.caption = 'Recaptioned'
+        photo.save()
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+
+    def test_list_etag_changes_with_related_rows(self):
+        segment = Segment.objects.first()
+        author = BlogPost.objects.first().author
+        cases = [
+            ('core:members', segment, 'title'),
+            ('core:projects', segment, 'title'),
+            ('core:blog', author, 'first_name'),
+        ]
+        for url_name, related, field in cases:
+            with self.subTest(view=url_name):
+                url = reverse(url_name)
+                response = self.client.get(url)
+                setattr(related, field, 'Renamed')
+                with self.captureOnCommitCallbacks(execute=True):
+                    related.save()
+                again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, 200)
+                self.assertContains(again, 'Renamed')
+
+    def test_logging_in_does_not_change_list_etags(self):
+        url = reverse('core:blog')
+        response = self.client.get(url)
+        author = BlogPost.objects.first().author
+        author.last_login = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save(update_fields=['last_login'])
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_list_etag_depends_on_query_string(self):
+        url = reverse('core:projects')
+        response = self.client.get(url)
+        again, _ = self.revalidate(url + '?status=completed', response)
+        self.assertEqual(again.status_code, 200)
+
+    def test_detail_view_answers_304_before_rendering(self):
+        project = Project.objects.first()
+        url = reverse('core:project_detail', args=[project.pk])
+        response = self.client.get(url)
+        again, queries = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(queries, 1)
+
+        Project.objects.filter(pk=project.pk).update(updated_at=timezone.now())
+        third, _ = self.revalidate(url, response)
+        self.assertEqual(third.status_code, 200)
+
+    def test_detail_etag_changes_with_related_rows(self):
+        project = Project.objects.first()
+        url = reverse('core:project_detail', args=[project.pk])
+        member = project.team_members.first()
+        edits = [
+            lambda: Member.objects.get(pk=member.pk).save(),
+            lambda: Segment.objects.get(pk=project.segment_id).save(),
+            lambda: project.team_members.remove(member),
+        ]
+        for edit in edits:
+            response = self.client.get(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                edit()
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(again.status_code, 200)
+        self.assertNotContains(again, member.name)
+
+    def test_page_cache_hits_answer_304(self):
+        url = reverse('core:blog')
+        response = self.client.get(url)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.cache = self.make_cache()
+
+    def make_cache(self):
+        """A cache sharing this test's directory but with its own local tier"""
+        return TieredCache(self.location, {
+            'TIMEOUT': 300, 'OPTIONS': {'LOCAL_MAX_ENTRIES': 2, 'LOCAL_TIMEOUT': 5},
+        })
+
+    def test_lru_serves_local_hits_and_evicts_to_the_shared_tier(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.assertEqual(self.cache.get('a'), 1)  # now most recently used
+        self.cache.set('c', 3)  # evicts b from the local tier only
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats
+        self.assertEqual(
+            {name: stats[name] for name in ('local_hits', 'shared_hits', 'misses', 'sets', 'local_entries')},
+            {'local_hits': 1, 'shared_hits': 1, 'misses': 1, 'sets': 3, 'local_entries': 2},
+        )
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+        self.cache.reset_stats()
+        self.assertEqual(self.cache.stats['hit_rate'], 0.0)
+
+    def test_local_tier_is_only_trusted_for_local_timeout(self):
+        other = self.make_cache()
+        self.cache.set('key', 'old')
+        other.set('key', 'new')
+        self.assertEqual(self.cache.get('key'), 'old')
+        with mock.patch('time.time', return_value=time.time() + 6):
+            self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_timeout_applies_to_both_tiers(self):
+        self.cache.set('key', 'value', timeout=2)
+        with mock.patch('time.time', return_value=time.time() + 3):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertIsNone(self.make_cache().get('key'))
+
+    def test_incr_keeps_the_timeout(self):
+        self.cache.set('count', 1, timeout=2)
+        self.assertEqual(self.cache.incr('count'), 2)
+        self.assertEqual(self.cache.decr('count', 2), 0)
+        with mock.patch('time.time', return_value=time.time() + 3):
+            self.assertIsNone(self.make_cache().get('count'))
+            with self.assertRaises(ValueError):
+                self.cache.incr('count')
+
+    def test_add_and_incr_are_atomic_across_caches(self):
+        caches = [self.make_cache() for _ in range(4)]
+        added = []
+
+        def work(cache):
+            added.append(cache.add('lock', True))
+            cache.add('count', 0)
+            for _ in range(25):
+                cache.incr('count')
+
+        threads = [threading.Thread(target=work, args=(cache,)) for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(added.count(True), 1)
+        self.assertEqual(self.make_cache().get('count'), 100)
+
+
+@override_settings(DOWNLOAD_COUNTER_FLUSH_SECONDS=0)
+class DownloadCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        counters.cache.clear()
+        self.resources = [
+            Resource.objects.create(title=f'Resource {i}', description='Resource', external_url='https://example.com')
+            for i in range(3)
+        ]
+
+    def downloads(self):
+        return [resource.downloads for resource in Resource.objects.order_by('pk')]
+
+    def test_downloads_are_buffered_until_flushed(self):
+        first, second, _ = self.resources
+        self.client.get(reverse('core:resource_download', args=[first.pk]))
+        counters.record_download(first.pk)
+        counters.record_download(second.pk)
+        self.assertEqual(self.downloads(), [0, 0, 0])
+        self.assertEqual(counters.pending_downloads([first.pk, second.pk]), {first.pk: 2, second.pk: 1})
+
+        with self.assertNumQueries(3):  # the UPDATE inside a savepoint
+            self.assertEqual(counters.flush_download_counts(), 3)
+        self.assertEqual(self.downloads(), [2, 1, 0])
+        self.assertEqual(counters.pending_downloads([first.pk, second.pk]), {})
+        self.assertEqual(counters.flush_download_counts(), 0)
+
+        counters.record_download(first.pk)
+        self.assertEqual(counters.flush_download_counts(), 1)
+        self.assertEqual(self.downloads(), [3, 1, 0])
+
+    def test_downloads_during_a_flush_stay_pending(self):
+        pk = self.resources[0].pk
+        counters.record_download(pk)
+        take = counters._take
+
+        def take_then_download(pk):
+            count = take(pk)
+            counters.record_download(pk)
+            return count
+
+        with mock.patch.object(counters, '_take', take_then_download):
+            self.assertEqual(counters.flush_download_counts(), 1)
+        self.assertEqual(counters.pending_downloads([pk]), {pk: 1})
+        self.assertEqual(counters.flush_download_counts(), 1)
+        self.assertEqual(self.downloads(), [2, 0, 0])
+
+    def test_concurrent_downloads_are_all_counted(self):
+        pks = [resource.pk for resource in self.resources]
+
+        def download():
+            for i in range(30):
+                counters.record_download(pks[i % 3])
+
+        threads = [threading.Thread(target=download) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counters.flush_download_counts(), 120)
+        self.assertEqual(self.downloads(), [40, 40, 40])
+
+    def test_a_slot_whose_writer_died_is_skipped_on_the_next_flush(self):
+        first, second, _ = self.resources
+        counters._incr(counters.DIRTY_COUNT_KEY)  # claimed, never written
+        counters.record_download(first.pk)
+        self.assertEqual(counters.flush_download_counts(), 0)
+        self.assertEqual(counters.flush_download_counts(), 1)
+        counters.record_download(second.pk)
+        self.assertEqual(counters.flush_download_counts(), 1)
+        self.assertEqual(self.downloads(), [1, 1, 0])
+
+    def test_a_reset_journal_flushes_every_resource(self):
+        pks = [resource.pk for resource in self.resources]
+        for pk in pks:
+            counters.record_download(pk)
+        self.assertEqual(counters.flush_download_counts(), 3)
+        for _ in range(2):
+            for pk in pks:
+                counters.record_download(pk)
+        counters.cache.delete(counters.DIRTY_COUNT_KEY)
+        counters.record_download(pks[0])
+        with self.assertLogs('core.counters', 'WARNING'):
+            self.assertEqual(counters.flush_download_counts(), 7)
+        self.assertEqual(self.downloads(), [4, 3, 3])
+        counters.record_download(pks[1])
+        self.assertEqual(counters.flush_download_counts(), 1)
+        self.assertEqual(self.downloads(), [4, 4, 3])
+
+    def test_flushing_purges_cached_pages_and_changes_the_etag(self):
+        url = reverse('core:resources')
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        counters.record_download(self.resources[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            counters.flush_download_counts()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': first['ETag']}).status_code, 200)
+
+    def test_an_empty_flush_purges_nothing(self):
+        url = reverse('core:resources')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(counters.flush_download_counts(), 0)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+
+@override_settings(DOWNLOAD_COUNTER_FLUSH_SECONDS=0)
+class ResourceDownloadTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        counters.cache.clear()
+        self.content = bytes(range(256)) * 4
+        self.resource = self.create_resource('résumé.pdf', self.content)
+        self.url = reverse('core:resource_download', args=[self.resource.pk])
+
+    def create_resource(self, name, content):
+        return Resource.objects.create(
+            title='Slides', description='Slides', file=SimpleUploadedFile(name, content),
+        )
+
+    def get(self, url=None, **headers):
+        return self.client.get(url or self.url, headers=headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def pending(self, resource=None):
+        pk = (resource or self.resource).pk
+        return counters.pending_downloads([pk]).get(pk, 0)
+
+    def test_full_download(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], "attachment; filename*=utf-8''r%C3%A9sum%C3%A9.pdf")
+        self.assertEqual(self.pending(), 1)
+
+    def test_byte_ranges(self):
+        cases = [
+            ('bytes=0-9', 'bytes 0-9/1024', self.content[:10]),
+            ('bytes=1000-', 'bytes 1000-1023/1024', self.content[1000:]),
+            ('bytes=-24', 'bytes 1000-1023/1024', self.content[-24:]),
+            ('bytes=1020-5000', 'bytes 1020-1023/1024', self.content[1020:]),
+        ]
+        for header, content_range, content in cases:
+            with self.subTest(range=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(content)))
+                self.assertEqual(self.body(response), content)
+        # Only the range starting at byte 0 counts as a new download
+        self.assertEqual(self.pending(), 1)
+
+    def test_multiple_and_malformed_ranges_send_the_whole_file(self):
+        for header in ['bytes=0-9,20-29', 'bytes=a-b', 'items=0-9', 'bytes=-']:
+            with self.subTest(range=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), self.content)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ['bytes=1024-', 'bytes=9-3', 'bytes=-0']:
+            with self.subTest(range=header), self.assertLogs('django.request', 'WARNING'):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */1024')
+        self.assertEqual(self.pending(), 0)
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag).status_code, 206)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"stale"').status_code, 200)
+
+    def test_not_modified(self):
+        response = self.get()
+        again = self.get(If_None_Match=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.pending(), 1)
+
+    def test_empty_file(self):
+        empty = self.create_resource('empty.txt', b'')
+        url = reverse('core:resource_download', args=[empty.pk])
+        for header in ['', 'bytes=0-', 'bytes=-5']:
+            with self.subTest(range=header):
+                response = self.get(url, Range=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Content-Range', response)
+                self.assertEqual(self.body(response), b'')
+
+    def test_head_requests_are_not_counted(self):
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.pending(), 0)
+
+    @override_settings(RESOURCE_DOWNLOAD_MODE='x-accel', RESOURCE_X_ACCEL_PREFIX='/protected/')
+    def test_x_accel_redirect(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/resources/r%C3%A9sum%C3%A9.pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.pending(), 1)
+
+    @override_settings(RESOURCE_DOWNLOAD_MODE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.resource.file.path)
+        self.assertEqual(response['Content-Disposition'], "attachment; filename*=utf-8''r%C3%A9sum%C3%A9.pdf")
+
+
+class CachePolicyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_public_pages_are_cached_and_tagged(self):
+        url = reverse('core:events')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Surrogate-Key'], 'event:list')
+        self.assertIn('public', second['Cache-Control'])
+
+    def test_shared_caches_get_a_short_lifetime(self):
+        response = self.client.get(reverse('core:events'))
+        self.assertEqual(response['Cache-Control'], f'public, max-age=0, s-maxage={settings.PAGE_SHARED_CACHE_MAX_AGE}')
+        self.assertLess(settings.PAGE_SHARED_CACHE_MAX_AGE, settings.PAGE_CACHE_TIMEOUT)
+        with override_settings(PAGE_SHARED_CACHE_MAX_AGE=10 ** 6):
+            self.assertIn(f's-maxage={settings.PAGE_CACHE_TIMEOUT}', self.client.get(reverse('core:faq'))['Cache-Control'])
+
+    def test_detail_pages_carry_object_keys(self):
+        post = BlogPost.objects.get(slug='post-0')
+        response = self.client.get(reverse('core:blog_detail', args=[post.slug]))
+        self.assertEqual(response['Surrogate-Key'].split(), ['blogpost:list', 'user:list', f'blogpost:{post.pk}'])
+
+    def test_authenticated_users_bypass_the_cache(self):
+        url = reverse('core:faq')
+        self.client.get(url)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+
+    def test_form_pages_are_never_cached(self):
+        for url_name in ['core:contact', 'core:membership_success']:
+            with self.subTest(view=url_name):
+                self.client.get(reverse(url_name))
+                response = self.client.get(reverse(url_name))
+                self.assertNotIn('X-Page-Cache', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_pages_using_csrf_tokens_are_not_stored(self):
+        def view(request):
+            return HttpResponse(get_token(request))
+
+        cached_view = CachePolicy().wrap(view)
+        for _ in range(2):
+            response = cached_view(RequestFactory().get('/token/'))
+            self.assertNotIn('X-Page-Cache', response)
+
+    def test_saving_a_model_purges_pages_tagged_with_it(self):
+        events_url = reverse('core:events')
+        blog_url = reverse('core:blog')
+        self.client.get(events_url)
+        self.client.get(blog_url)
+
+        event = Event.objects.first()
+        event.title = 'Rescheduled'
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        response = self.client.get(events_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Rescheduled')
+        self.assertEqual(self.client.get(blog_url)['X-Page-Cache'], 'hit')
+
+    def test_detail_pages_are_purged_by_object(self):
+        first, second = Event.objects.all()[:2]
+        first_url = reverse('core:event_detail', args=[first.pk])
+        second_url = reverse('core:event_detail', args=[second.pk])
+        self.client.get(first_url)
+        self.client.get(second_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.client.get(first_url)['X-Page-Cache'], 'hit')
+        self.assertEqual(self.client.get(second_url).status_code, 404)
+
+    def test_a_purge_during_the_render_is_not_lost(self):
+        event = Event.objects.first()
+        url = reverse('core:event_detail', args=[event.pk])
+        get_object = views.EventDetailView.get_object
+
+        def get_object_then_purge(view):
+            obj = get_object(view)
+            # A save committed after the read but before the page is stored
+            purge_surrogate_keys(f'event:{event.pk}')
+            return obj
+
+        with mock.patch.object(views.EventDetailView, 'get_object', get_object_then_purge):
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_m2m_changes_purge_the_owning_object(self):
+        project = Project.objects.first()
+        url = reverse('core:project_detail', args=[project.pk])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            project.team_members.clear()
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def test_purge_waits_for_the_commit(self):
+        url = reverse('core:events')
+        self.client.get(url)
+        event = Event.objects.first()
+        event.title = 'Rescheduled'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            event.save()
+            # Until the transaction commits the cached page stays as it was
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        self.assertTrue(callbacks)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def test_tasks_do_not_purge_pages(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Task.objects.create(name='images.process', key='images.process:x')
+        self.assertEqual(callbacks, [])
+
+
+class LazySessionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session['visitor'] = 1
+        session.save()
+        self.session_key = session.session_key
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def session_writes(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return sum(is_session_write(query['sql']) for query in context.captured_queries)
+
+    def test_read_sessions_are_touched_once_per_interval(self):
+        url = reverse('core:faq')
+        self.assertEqual(self.session_writes(url), 1)
+        self.assertEqual(self.session_writes(url), 0)
+        self.assertEqual(self.session_writes(url), 0)
+
+    @override_settings(SESSION_TOUCH_SECONDS=0)
+    def test_expired_touch_interval_saves_again(self):
+        url = reverse('core:faq')
+        self.assertEqual(self.session_writes(url), 1)
+        self.assertEqual(self.session_writes(url), 1)
+
+
+class DatabaseSettingsTests(TestCase):
+
+    def load_databases(self, **environ):
+        """``DATABASES`` as settings.py builds it from ``environ``"""
+        names = ['DB_ENGINE', 'DB_POOL', 'DB_CONN_MAX_AGE', 'DATABASE_REPLICA_NAME']
+        clean = {name: value for name, value in os.environ.items() if name not in names}
+        with mock.patch.dict(os.environ, {**clean, **environ}, clear=True):
+            return runpy.run_path(str(settings.BASE_DIR / 'ncc_website' / 'settings.py'))['DATABASES']
+
+    def test_connections_persist_by_default(self):
+        default = self.load_databases()['default']
+        self.assertEqual((default['CONN_MAX_AGE'], default['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertEqual(self.load_databases(DB_CONN_MAX_AGE='0')['default']['CONN_MAX_AGE'], 0)
+
+    def test_pool_replaces_persistent_connections(self):
+        default = self.load_databases(DB_ENGINE='postgresql', DB_POOL='True', DB_CONN_MAX_AGE='300')['default']
+        self.assertEqual(default['CONN_MAX_AGE'], 0)
+        self.assertEqual(default['OPTIONS']['pool'], {'min_size': 2, 'max_size': 10, 'timeout': 10})
+
+        default = self.load_databases(DB_ENGINE='postgresql', DB_CONN_MAX_AGE='300')['default']
+        self.assertEqual(default['CONN_MAX_AGE'], 300)
+        self.assertNotIn('pool', default['OPTIONS'])
+
+    def test_replica_copies_the_connection_settings(self):
+        databases = self.load_databases(DATABASE_REPLICA_NAME='replica.sqlite3')
+        self.assertEqual(databases['replica']['CONN_MAX_AGE'], databases['default']['CONN_MAX_AGE'])
+
+
+class SQLitePragmaTests(TestCase):
+
+    def test_connections_are_tuned(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            for name, expected in [('busy_timeout', 5000), ('synchronous', 1), ('temp_store', 2)]:
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_pragma_values_are_validated(self):
+        self.assertEqual(pragma_statements({'cache_size': -2000}), ['PRAGMA cache_size = -2000'])
+        with self.assertRaises(ValueError):
+            pragma_statements({'journal_mode': 'WAL; DROP TABLE core_faq'})
+
+
+@mock.patch('core.routers.replica_configured', return_value=True)
+class ReplicaRoutingTests(TestCase):
+
+    def test_reads_use_the_replica_until_a_write(self, configured):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Event), 'default')
+        with request_routing(use_replica=True):
+            self.assertEqual(router.db_for_read(Event), 'replica')
+            router.db_for_write(Session)
+            self.assertEqual(router.db_for_read(Event), 'replica')
+            router.db_for_write(ContactSubmission)
+            self.assertEqual(router.db_for_read(Event), 'default')
+        with request_routing(use_replica=True):
+            self.assertEqual(router.db_for_read(Event), 'replica')
+
+    def test_writes_pin_the_visitor_to_the_primary(self, configured):
+        response = self.client.post(reverse('core:newsletter_subscribe'), {'email': 'a@example.com'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        middleware = ReplicaRoutingMiddleware(lambda request: None)
+        factory = RequestFactory()
+        self.assertTrue(middleware.use_replica(factory.get('/events/')))
+        self.assertFalse(middleware.use_replica(factory.get('/admin/core/event/')))
+        pinned = factory.get('/events/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        self.assertFalse(middleware.use_replica(pinned))
+
+
+@override_settings(ROOT_URLCONF='ncc_website.async_urls')
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_site_content(3)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_async_views_render_the_same_pages(self):
+        for url_name in ['core:home', 'core:faq', 'core:members', 'core:gallery', 'core:blog', 'core:projects']:
+            with self.subTest(view=url_name):
+                url = reverse(url_name)
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with override_settings(ROOT_URLCONF='ncc_website.urls'):
+                    await sync_to_async(cache.clear)()
+                    sync_response = await sync_to_async(self.client.get)(url)
+                self.assertEqual(response['ETag'], sync_response['ETag'])
+
+    async def test_async_list_view_answers_304(self):
+        url = reverse('core:events')
+        response = await self.async_client.get(url)
+        await sync_to_async(cache.clear)()
+        again = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    @override_settings(DEBUG=True)
+    async def test_async_views_count_their_queries(self):
+        url = reverse('core:faq')
+        response = await self.async_client.get(url)
+        with override_settings(ROOT_URLCONF='ncc_website.urls'):
+            await sync_to_async(cache.clear)()
+            sync_response = await sync_to_async(self.client.get)(url)
+        self.assertNotEqual(response['X-Query-Count'], '0')
+        self.assertEqual(response['X-Query-Count'], sync_response['X-Query-Count'])
+
+    async def test_async_search(self):
+        response = await self.async_client.get(reverse('core:search'), {'query': 'post'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['results']['blog_posts']), 3)
+
+
+class ImageDerivativeTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def upload(self, width=1000, height=750, exif=None, **options):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), 'steelblue').save(buffer, 'JPEG', exif=exif or Image.Exif(), **options)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def camera_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        return exif
+
+    def render(self, source, **context):
+        return Template('{% load images %}' + source).render(Context(context))
+
+    def test_derivatives_are_generated_by_the_worker(self):
+        photo = GalleryPhoto.objects.create(image=self.upload(), caption='Photo')
+        self.assertIsNone(images.get_manifest(photo.image))
+        queued = Task.objects.get(name='images.process')
+        self.assertEqual(queued.args, ['core.galleryphoto', photo.pk])
+
+        self.assertEqual(tasks.run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.progress), ('done', 100))
+        manifest = images.get_manifest(photo.image)
+        self.assertEqual(manifest['widths'], [320, 640, 960])
+        self.assertEqual(manifest['fallback'], 'jpg')
+        storage = photo.image.storage
+        for extension in manifest['formats'] + ['jpg']:
+            self.assertTrue(storage.exists(images.derivative_name(photo.image.name, 320, extension)))
+        with storage.open(images.thumbnail_name(photo.image.name, 'card')) as f:
+            self.assertEqual(Image.open(f).size, (480, 360))
+
+    def test_original_is_rotated_and_stripped_of_exif(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # orientation: rotate 90 degrees clockwise
+        exif[0x010F] = 'Camera maker'
+        photo = GalleryPhoto.objects.create(image=self.upload(exif=exif), caption='Photo')
+        tasks.run_pending()
+        with photo.image.storage.open(photo.image.name) as f:
+            original = Image.open(f)
+            self.assertEqual(original.size, (750, 1000))
+            self.assertEqual(dict(original.getexif()), {})
+
+    def test_original_keeps_its_jpeg_quality(self):
+        upload = self.upload(exif=self.camera_exif(), quality=95)
+        source = Image.open(io.BytesIO(upload.read()))
+        upload.seek(0)
+        photo = GalleryPhoto.objects.create(image=upload, caption='Photo')
+        tasks.run_pending()
+        with photo.image.storage.open(photo.image.name) as f:
+            original = Image.open(f)
+            self.assertEqual(dict(original.getexif()), {})
+            self.assertEqual(original.quantization, source.quantization)
+
+    def test_webp_original_is_stripped_losslessly(self):
+        image = Image.effect_noise((64, 48), 40).convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'WEBP', lossless=True, exif=self.camera_exif())
+        photo = GalleryPhoto.objects.create(image=SimpleUploadedFile('photo.webp', buffer.getvalue()), caption='Photo')
+        tasks.run_pending()
+        with photo.image.storage.open(photo.image.name) as f:
+            original = Image.open(f)
+            self.assertNotIn('exif', original.info)
+            self.assertEqual(original.convert('RGB').tobytes(), image.tobytes())
+
+    def test_animated_original_is_left_alone(self):
+        frames = [Image.new('RGB', (64, 48), colour) for colour in ('red', 'blue')]
+        buffer = io.BytesIO()
+        frames[0].save(buffer, 'WEBP', save_all=True, append_images=frames[1:], exif=self.camera_exif())
+        photo = GalleryPhoto.objects.create(image=SimpleUploadedFile('photo.webp', buffer.getvalue()), caption='Photo')
+        tasks.run_pending()
+        with photo.image.storage.open(photo.image.name) as f:
+            self.assertEqual(f.read(), buffer.getvalue())
+
+    def test_responsive_image_tag(self):
+        photo = GalleryPhoto.objects.create(image=self.upload(), caption='Photo')
+        tasks.run_pending()
+        html = self.render(
+            '{% responsive_image photo.image sizes="50vw" picture_class="d-block" alt="A photo" %}',
+            photo=photo,
+        )
+        self.assertIn('<picture class="d-block">', html)
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('640w.webp 640w', html)
+        self.assertIn(f'{photo.image.url} 1000w', html)
+        self.assertIn('width="1000" height="750"', html)
+        self.assertIn('loading="lazy"', html)
+
+    @override_settings(IMAGE_PROCESS_WORKERS=2)
+    def test_bulk_upload_stores_files_and_processes_them_in_a_pool(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for n in range(3):
+                zf.writestr(f'album/photo{n}.jpg', self.upload(400, 300).read())
+            zf.writestr('album/notes.txt', 'not an image')
+            zf.writestr('__MACOSX/album/._photo0.jpg', 'resource fork')
+        archive = SimpleUploadedFile('album.zip', archive.getvalue(), content_type='application/zip')
+
+        response = self.client.post(reverse('admin:core_galleryphoto_bulk_upload'), {
+            'files': [archive, self.upload(500, 400)], 'category': 'event',
+        })
+        self.assertRedirects(response, reverse('admin:core_galleryphoto_changelist'))
+        photos = GalleryPhoto.objects.order_by('caption')
+        self.assertEqual([photo.caption for photo in photos], ['photo', 'photo0', 'photo1', 'photo2'])
+        self.assertTrue(all(photo.image.storage.exists(photo.image.name) for photo in photos))
+        queued = Task.objects.get(name='images.process_batch')
+        self.assertEqual(sorted(queued.args[1]), sorted(photo.pk for photo in photos))
+
+        tasks.run_pending()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.progress), ('done', 100))
+        for photo in photos:
+            self.assertEqual(images.get_manifest(photo.image)['widths'], [320])
+
+    def test_bulk_upload_rejects_a_corrupt_zip(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse('admin:core_galleryphoto_bulk_upload'), {
+            'files': SimpleUploadedFile('album.zip', b'not a zip'), 'category': 'event',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'not a valid ZIP archive')
+        self.assertFalse(GalleryPhoto.objects.exists())
+
+    def test_bulk_upload_skips_decompression_bombs(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100 * 100):
+            response = self.client.post(reverse('admin:core_galleryphoto_bulk_upload'), {
+                'files': [self.upload(400, 300), self.upload(50, 50)], 'category': 'event',
+            })
+        self.assertRedirects(response, reverse('admin:core_galleryphoto_changelist'))
+        self.assertEqual(GalleryPhoto.objects.count(), 1)
+        with GalleryPhoto.objects.get().image.open() as f, Image.open(f) as image:
+            self.assertEqual(image.size, (50, 50))
+
+    def test_falls_back_to_the_original_without_derivatives(self):
+        photo = GalleryPhoto.objects.create(image='gallery/missing.jpg', caption='Photo')
+        self.assertIsNone(images.get_manifest(photo.image))
+        html = self.render('{% responsive_image photo.image alt="x" %}', photo=photo)
+        self.assertTrue(html.startswith(f'<img src="{photo.image.url}"'))
+        self.assertNotIn('srcset', html)
+        self.assertEqual(self.render("{% thumbnail_url photo.image 'card' %}", photo=photo), photo.image.url)
+
+
+@tasks.task('tests.flaky')
+def flaky_task(queued, failures):
+    if queued.attempts <= failures:
+        raise ValueError('Not yet')
+    tasks.task_progress(queued, 1, 2, 'Halfway')
+
+
+@override_settings(TASK_RETRY_DELAY=60)
+class TaskQueueTests(TestCase):
+
+    def test_duplicate_pending_tasks_are_not_queued(self):
+        first = tasks.enqueue('tests.flaky', 0)
+        self.assertEqual(tasks.enqueue('tests.flaky', 0), first)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failed_task_is_retried_with_backoff(self):
+        queued = tasks.enqueue('tests.flaky', 1)
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(tasks.run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('pending', 1))
+        self.assertIn('Not yet', queued.last_error)
+        self.assertGreater(queued.run_after, timezone.now() + timezone.timedelta(seconds=50))
+        self.assertEqual(tasks.run_pending(), 0)
+
+        Task.objects.update(run_after=timezone.now())
+        self.assertEqual(tasks.run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, queued.progress), ('done', 2, 100))
+
+    def test_task_fails_after_max_attempts_and_can_be_retried(self):
+        queued = tasks.enqueue('tests.flaky', 5, max_attempts=1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertEqual(tasks.retry(Task.objects.all()), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('pending', 0))
+
+    def test_stale_running_task_is_claimed_again(self):
+        queued = tasks.enqueue('tests.flaky', 0)
+        self.assertEqual(tasks.claim_task().attempts, 1)
+        self.assertIsNone(tasks.claim_task())
+        Task.objects.update(updated_at=timezone.now() - timezone.timedelta(seconds=settings.TASK_TIMEOUT + 1))
+        reclaimed = tasks.claim_task()
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (queued.pk, 2))
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 2)
+
+    def test_progress_keeps_a_long_task_claimed(self):
+        tasks.enqueue('tests.flaky', 0)
+        claimed = tasks.claim_task()
+        Task.objects.update(started_at=timezone.now() - timezone.timedelta(seconds=settings.TASK_TIMEOUT + 1))
+        tasks.task_progress(claimed, 1, 2)
+        self.assertIsNone(tasks.claim_task())
+
+    def test_stale_task_fails_once_out_of_attempts(self):
+        queued = tasks.enqueue('tests.flaky', 0, max_attempts=2)
+        for _ in range(2):
+            self.assertIsNotNone(tasks.claim_task())
+            Task.objects.update(updated_at=timezone.now() - timezone.timedelta(seconds=settings.TASK_TIMEOUT + 1))
+        self.assertIsNone(tasks.claim_task())
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+        self.assertIn('stopped responding', queued.last_error)
+
+
+class StaticFilesTests(TestCase):
+
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        settings_override = override_settings(STATIC_ROOT=static_root, STATIC_SERVE=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        url = static('css/style.css')
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        path = settings.STATIC_ROOT + url.removeprefix('/static')
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(compressed.read(), original.read())
+
+    def test_hashed_file_is_served_compressed_and_immutable(self):
+        url = static('css/style.css')
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Disposition', response)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content))[:1], b'/')
+
+        identity = self.client.get(url, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertNotEqual(identity['ETag'], response['ETag'])
+
+        again = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_unhashed_file_gets_a_short_max_age(self):
+        response = self.client.get('/static/css/style.css')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_MAX_AGE}')
+
+    def test_security_middleware_runs_first(self):
+        response = self.client.get(static('css/style.css'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Referrer-Policy'], 'same-origin')
+        self.assertEqual(response['Cross-Origin-Opener-Policy'], 'same-origin')
+
+    def test_missing_manifest_is_reported(self):
+        storage = CompressedManifestStaticFilesStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, storage.location)
+        with self.assertLogs('core.staticfiles', 'WARNING') as logs:
+            self.assertEqual(storage.stored_name('css/style.css'), 'css/style.css')
+            storage.stored_name('js/main.js')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('collectstatic', logs.output[0])
+
+    async def test_served_under_asgi(self):
+        response = await self.async_client.get(static('img/ncc-logo.svg'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml; charset=utf-8')
+        self.assertIn(b'<svg', b''.join([chunk async for chunk in response.streaming_content]))
+
+
+class CriticalCSSTests(TestCase):
+
+    def test_minify_keeps_strings_intact(self):
+        source = "/* comment */\na > b ,  c:hover {\n  content: 'a  ;  b' ;\n  margin : 0 auto;\n}\n"
+        self.assertEqual(css.minify(source), "a>b,c:hover{content:'a  ;  b';margin:0 auto}")
+
+    def test_minify_keeps_descendant_pseudo_class_selectors(self):
+        source = '.a :first-child, ul  li :not(.b) > :last-child { color : red }\n@media (max-width: 768px) { .c  :hover { margin : 0 } }'
+        self.assertEqual(
+            css.minify(source),
+            '.a :first-child,ul li :not(.b)>:last-child{color:red}@media (max-width:768px){.c :hover{margin:0}}',
+        )
+
+    def test_critical_css_keeps_rules_used_by_the_markup(self):
+        stylesheet = css.minify("""
+            :root { --x: 1px; }
+            .hero .title, .footer { color: red; }
+            .hero:hover { color: blue; }
+            .hero::before { content: ''; }
+            #main p { margin: 0; }
+            @media (max-width: 768px) { .hero { padding: 0; } .card { padding: 1px; } }
+            @keyframes spin { to { transform: rotate(360deg); } }
+        """)
+        markup = '<div id="main" class="hero {% if x %}wide{% endif %}"><h1 class="title">Hi</h1></div>'
+        self.assertEqual(
+            css.critical_css(stylesheet, markup),
+            ":root{--x:1px}.hero .title{color:red}.hero::before{content:''}"
+            "@media (max-width:768px){.hero{padding:0}}",
+        )
+
+    def test_generated_css_is_up_to_date(self):
+        call_command('build_css', check=True, stdout=io.StringIO())
+
+    def test_homepage_inlines_critical_css(self):
+        response = self.client.get(reverse('core:home'))
+        self.assertContains(response, '<style>:root{')
+        self.assertContains(response, 'rel="preload" href="/static/css/style.min.css" as="style"')
+        self.assertNotContains(response, '{% verbatim %}')
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            GalleryPhoto.objects.create(image=f'gallery/{i}.jpg', caption=f'Photo {i}')
+        # Three rows share the newest timestamp, so the pk has to break ties
+        newest = timezone.now()
+        GalleryPhoto.objects.filter(pk__in=GalleryPhoto.objects.order_by('pk').values('pk')[:3]).update(uploaded_at=newest)
+
+    def test_next_and_previous_walk_every_row_once(self):
+        paginator = CursorPaginator(GalleryPhoto.objects.all(), 3)
+        expected = list(GalleryPhoto.objects.order_by('-uploaded_at', 'pk').values_list('pk', flat=True))
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([[photo.pk for photo in page] for page in pages], [expected[:3], expected[3:6], expected[6:]])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([photo.pk for photo in back], expected[3:6])
+        self.assertEqual([photo.pk for photo in paginator.page(back.previous_cursor)], expected[:3])
+
+    def test_malformed_cursor_is_a_404(self):
+        cursors = [
+            'not-base64!',
+            encode_cursor(['abc', 1]),
+            encode_cursor(['2020-01-01T00:00:00+00:00', 'x']),
+            encode_cursor([[1], {'a': 1}]),
+            encode_cursor(['2020-01-01T00:00:00+00:00']),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                cache.clear()
+                with self.assertLogs('django.request', 'WARNING'):
+                    response = self.client.get(reverse('core:gallery'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
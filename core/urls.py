@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from .cache_policy import NEVER_CACHE, CachePolicy, apply_cache_policies
 
 app_name = 'core'
 
@@ -56,4 +57,41 @@ urlpatterns = [
     
     # Admin dashboard
     path('admin/dashboard/', views.admin_dashboard_view, name='admin_dashboard'),
-]
\ No newline at end of file
+    path('admin/dashboard/stats/', views.admin_dashboard_stats, name='admin_dashboard_stats'),
+    path('admin/dashboard/queries/', views.admin_query_report, name='admin_query_report'),
+]
+
+# Page cache policy per URL name (see core.cache_policy). Surrogate keys name
+# the content each page renders; detail views add "<model>:<pk>" themselves.
+ONE_DAY = 60 * 60 * 24
+
+CACHE_POLICIES = {
+    'home': CachePolicy(surrogate_keys=['segment:list', 'blogpost:list', 'event:list', 'project:list']),
+    'about': CachePolicy(timeout=ONE_DAY),
+    'segments': CachePolicy(surrogate_keys=['segment:list']),
+    'segment_detail': CachePolicy(surrogate_keys=['member:list']),
+    'members': CachePolicy(surrogate_keys=['member:list', 'segment:list']),
+    'achievements': CachePolicy(surrogate_keys=['achievement:list']),
+    'gallery': CachePolicy(surrogate_keys=['galleryphoto:list']),
+    'events': CachePolicy(surrogate_keys=['event:list']),
+    'event_detail': CachePolicy(),
+    'blog': CachePolicy(surrogate_keys=['blogpost:list', 'user:list']),
+    'blog_detail': CachePolicy(surrogate_keys=['blogpost:list', 'user:list']),
+    'projects': CachePolicy(surrogate_keys=['project:list', 'segment:list']),
+    'project_detail': CachePolicy(surrogate_keys=['project:list', 'member:list', 'segment:list']),
+    'resources': CachePolicy(surrogate_keys=['resource:list']),
+    'faq': CachePolicy(surrogate_keys=['faq:list']),
+    'search': CachePolicy(timeout=60 * 5, surrogate_keys=[
+        'member:list', 'event:list', 'achievement:list', 'blogpost:list',
+        'project:list', 'resource:list', 'user:list',
+    ]),
+    'robots_txt': CachePolicy(timeout=ONE_DAY),
+
+    # Forms: CSRF tokens and flash messages are per visitor
+    'contact': NEVER_CACHE,
+    'newsletter_subscribe': NEVER_CACHE,
+    'membership_application': NEVER_CACHE,
+    'membership_success': NEVER_CACHE,
+}
+
+urlpatterns = apply_cache_policies(urlpatterns, CACHE_POLICIES)
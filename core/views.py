@@ -2,8 +2,11 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.models import User
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition
 from django.http import JsonResponse, HttpResponse, Http404
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Max, Prefetch, prefetch_related_objects
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.urls import reverse_lazy, reverse
@@ -12,30 +15,33 @@ from django.core.mail import send_mail
 from django.conf import settings
 from .models import (
     Segment, Member, Achievement, GalleryPhoto, Event,
-    ContactSubmission, Newsletter, BlogPost, FAQ, Project, 
-    Resource, MembershipApplication
+    BlogPost, FAQ, Project, Resource, MembershipApplication
 )
 from .forms import (
     ContactForm, NewsletterForm, MembershipApplicationForm,
     SearchForm
 )
+from . import search
+from .cache_policy import add_surrogate_keys
+from .conditional import (
+    ConditionalListMixin, audience, make_etag, not_modified_response, set_validators,
+)
+from .counters import record_download
+from .dashboard import get_dashboard_stats
+from .middleware import get_query_report
+from .downloads import file_download_response, is_new_download
+from .pagination import CursorPaginationMixin
+from .related import get_related_items, related_version
+from .snapshots import get_home_snapshot
 
 
 def home_view(request):
-    """Homepage view with segments showcase"""
-    segments = Segment.objects.all()[:6]  # Show first 6 segments
-    recent_news = BlogPost.objects.filter(status='published')[:3]
-    upcoming_events = Event.objects.filter(status='upcoming')[:3]
-    featured_projects = Project.objects.filter(status='completed')[:3]
-    
-    context = {
-        'segments': segments,
-        'recent_news': recent_news,
-        'upcoming_events': upcoming_events,
-        'featured_projects': featured_projects,
-        'page_title': 'NITER Computer Club'
-    }
-    return render(request, 'core/home.html', context)
+    """Homepage view with segments showcase, served from the precomputed snapshot"""
+    html, context = get_home_snapshot(request)
+    if request.user.is_staff:
+        # The snapshot is rendered for anonymous visitors; staff see admin links
+        return render(request, 'core/home.html', context)
+    return HttpResponse(html)
 
 
 def about_view(request):
@@ -46,7 +52,62 @@ def about_view(request):
     return render(request, 'core/about.html', context)
 
 
-class SegmentListView(ListView):
+class ContentDetailView(DetailView):
+    """
+    Base for the public detail pages.
+
+    Works from ``self.object`` (fetched once in ``get``), caches the
+    optional ``related_context_name`` list per object until
+    ``related_model`` changes, and answers conditional requests from
+    validators derived from the object's ``updated_at`` (and the versions
+    of ``related_model`` and ``validator_models``) with 304 before anything
+    is rendered.
+    """
+    related_model = None
+    related_context_name = None
+    validator_models = ()
+
+    def get_related_queryset(self):
+        raise NotImplementedError('Subclasses setting related_context_name must define this')
+
+    def get_validators(self):
+        """Return ``(etag, last_modified)`` for ``self.object``"""
+        obj = self.object
+        parts = [obj._meta.label_lower, obj.pk, obj.updated_at.isoformat(), audience(self.request)]
+        if self.related_model is not None:
+            parts.append(related_version(self.related_model))
+        parts.extend(related_version(model) for model in self.validator_models)
+        return make_etag(*parts), obj.updated_at
+
+    def get(self, request, *args, **kwargs):
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        if pk is not None:
+            # Tagged before the read, so a save committed meanwhile purges this render
+            add_surrogate_keys(request, f'{self.model._meta.model_name}:{pk}')
+        self.object = self.get_object()
+        if pk is None:
+            # Found by slug: the policy's "<model>:list" key, read up front, covers the race
+            add_surrogate_keys(request, f'{self.model._meta.model_name}:{self.object.pk}')
+        etag, last_modified = self.get_validators()
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        context = self.get_context_data(object=self.object)
+        response = self.render_to_response(context)
+        return set_validators(response, etag, last_modified)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = f'{self.object.title} - NITER Computer Club'
+        if self.related_context_name:
+            context[self.related_context_name] = get_related_items(
+                self.object, self.related_context_name,
+                self.get_related_queryset, self.related_model,
+            )
+        return context
+
+
+class SegmentListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List all segments"""
     model = Segment
     template_name = 'core/segments.html'
@@ -59,42 +120,51 @@ class SegmentListView(ListView):
         return context
 
 
-class SegmentDetailView(DetailView):
+class SegmentDetailView(ContentDetailView):
     """Segment detail page with members"""
     model = Segment
     template_name = 'core/segment_detail.html'
     context_object_name = 'segment'
+    related_model = Member
 
     def get_context_data(self, **kwargs):
+        # Prefetched here rather than in get_queryset so a 304 skips it
+        prefetch_related_objects(
+            [self.object],
+            Prefetch('members', queryset=Member.objects.only(
+                'name', 'role', 'position', 'photo', 'order', 'segment_id'
+            )),
+        )
         context = super().get_context_data(**kwargs)
-        segment = self.get_object()
-        context['members'] = segment.members.all()
-        context['page_title'] = f'{segment.title} - NITER Computer Club'
+        context['members'] = self.object.members.all()
         return context
 
 
-class MemberListView(ListView):
+class MemberListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List all members"""
     model = Member
     template_name = 'core/members.html'
     context_object_name = 'members'
     paginate_by = 20
+    validator_models = (Segment,)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Our Panel - NITER Computer Club'
-        context['segments'] = Segment.objects.all()
+        context['segments'] = Segment.objects.only('title')
         return context
 
     def get_queryset(self):
-        queryset = Member.objects.all()
+        queryset = Member.objects.select_related('segment').only(
+            'name', 'role', 'photo', 'order', 'segment__title'
+        )
         segment_filter = self.request.GET.get('segment')
         if segment_filter:
             queryset = queryset.filter(segment__id=segment_filter)
         return queryset
 
 
-class AchievementListView(ListView):
+class AchievementListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List all achievements"""
     model = Achievement
     template_name = 'core/achievements.html'
@@ -115,12 +185,13 @@ class AchievementListView(ListView):
         return queryset
 
 
-class GalleryListView(ListView):
+class GalleryListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """Gallery view"""
     model = GalleryPhoto
     template_name = 'core/gallery.html'
     context_object_name = 'photos'
     paginate_by = 20
+    cursor_pagination = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -136,7 +207,7 @@ class GalleryListView(ListView):
         return queryset
 
 
-class EventListView(ListView):
+class EventListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List all events"""
     model = Event
     template_name = 'core/events.html'
@@ -157,43 +228,41 @@ class EventListView(ListView):
         return queryset
 
 
-class EventDetailView(DetailView):
+class EventDetailView(ContentDetailView):
     """Event detail page"""
     model = Event
     template_name = 'core/event_detail.html'
     context_object_name = 'event'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        event = self.get_object()
-        context['page_title'] = f'{event.title} - NITER Computer Club'
-        return context
-
 
 # Admin Dashboard Views
 @staff_member_required
 def admin_dashboard_view(request):
     """Admin dashboard with statistics"""
     context = {
-        'segments_count': Segment.objects.count(),
-        'members_count': Member.objects.count(),
-        'achievements_count': Achievement.objects.count(),
-        'photos_count': GalleryPhoto.objects.count(),
-        'events_count': Event.objects.count(),
-        'projects_count': Project.objects.count(),
-        'blog_posts_count': BlogPost.objects.count(),
-        'applications_count': MembershipApplication.objects.filter(status='pending').count(),
-        'contact_submissions': ContactSubmission.objects.filter(is_read=False).count(),
-        'newsletter_subscribers': Newsletter.objects.filter(is_active=True).count(),
+        **get_dashboard_stats(),
         'recent_members': Member.objects.order_by('-created_at')[:5],
-        'recent_achievements': Achievement.objects.order_by('-created_at')[:5],
         'upcoming_events': Event.objects.filter(status='upcoming').order_by('date')[:5],
-        'recent_applications': MembershipApplication.objects.order_by('-submitted_at')[:5],
+        'stats_refresh_seconds': getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 30),
         'page_title': 'Dashboard - NCC Admin'
     }
     return render(request, 'admin/dashboard.html', context)
 
 
+@never_cache
+@staff_member_required
+def admin_dashboard_stats(request):
+    """Dashboard counters as JSON for auto-refresh"""
+    return JsonResponse(get_dashboard_stats())
+
+
+@never_cache
+@staff_member_required
+def admin_query_report(request):
+    """Per-view SQL query statistics collected by QueryCountMiddleware"""
+    return JsonResponse(get_query_report())
+
+
 # Contact and Communication Views
 def contact_view(request):
     """Contact form and information"""
@@ -236,15 +305,20 @@ def newsletter_subscribe(request):
 
 
 # Blog Views
-class BlogListView(ListView):
+class BlogListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List published blog posts"""
     model = BlogPost
     template_name = 'core/blog.html'
     context_object_name = 'posts'
     paginate_by = 10
+    cursor_pagination = True
+    validator_models = (User,)
     
     def get_queryset(self):
-        return BlogPost.objects.filter(status='published').order_by('-published_at')
+        return BlogPost.objects.filter(status='published').select_related('author').only(
+            'title', 'slug', 'excerpt', 'featured_image', 'tags', 'published_at',
+            'author__username', 'author__first_name', 'author__last_name',
+        ).order_by('-published_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -252,28 +326,37 @@ class BlogListView(ListView):
         return context
 
 
-class BlogDetailView(DetailView):
+class BlogDetailView(ContentDetailView):
     """Blog post detail view"""
     model = BlogPost
     template_name = 'core/blog_detail.html'
     context_object_name = 'post'
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
+    related_model = BlogPost
+    related_context_name = 'related_posts'
+    validator_models = (User,)
     
     def get_queryset(self):
-        return BlogPost.objects.filter(status='published')
+        return BlogPost.objects.filter(status='published').select_related('author')
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        context['page_title'] = f'{post.title} - NITER Computer Club'
-        context['related_posts'] = BlogPost.objects.filter(
+    def get_related_queryset(self):
+        return BlogPost.objects.filter(
             status='published'
-        ).exclude(id=post.id).order_by('-published_at')[:3]
-        return context
+        ).exclude(id=self.object.id).only(
+            'title', 'slug', 'excerpt', 'featured_image', 'published_at'
+        ).order_by('-published_at')[:3]
 
 
 # FAQ View
+def _faq_etag(request):
+    stats = FAQ.objects.filter(is_active=True).aggregate(
+        last_modified=Max('updated_at'), count=Count('pk'),
+    )
+    return make_etag('faq', audience(request), stats['last_modified'], stats['count'])
+
+
+@condition(etag_func=_faq_etag)
 def faq_view(request):
     """FAQ page"""
     faqs = FAQ.objects.filter(is_active=True).order_by('order', 'question')
@@ -288,22 +371,26 @@ def faq_view(request):
 
 
 # Projects Views
-class ProjectListView(ListView):
+class ProjectListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List all projects"""
     model = Project
     template_name = 'core/projects.html'
     context_object_name = 'projects'
     paginate_by = 12
+    validator_models = (Segment,)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Projects - NITER Computer Club'
         context['statuses'] = Project.STATUS_CHOICES
-        context['segments'] = Segment.objects.all()
+        context['segments'] = Segment.objects.only('title')
         return context
     
     def get_queryset(self):
-        queryset = Project.objects.all()
+        queryset = Project.objects.select_related('segment').only(
+            'title', 'description', 'technologies', 'github_url', 'live_demo_url',
+            'image', 'status', 'created_at', 'segment__title',
+        )
         status_filter = self.request.GET.get('status')
         segment_filter = self.request.GET.get('segment')
         
@@ -315,29 +402,40 @@ class ProjectListView(ListView):
         return queryset
 
 
-class ProjectDetailView(DetailView):
+class ProjectDetailView(ContentDetailView):
     """Project detail view"""
     model = Project
     template_name = 'core/project_detail.html'
     context_object_name = 'project'
+    related_model = Project
+    related_context_name = 'related_projects'
+    validator_models = (Member, Segment)  # the team and the segment title
     
+    def get_queryset(self):
+        return Project.objects.select_related('segment')
+
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        project = self.get_object()
-        context['page_title'] = f'{project.title} - NITER Computer Club'
-        context['related_projects'] = Project.objects.filter(
-            segment=project.segment
-        ).exclude(id=project.id)[:3]
-        return context
+        # Prefetched here rather than in get_queryset so a 304 skips it
+        prefetch_related_objects(
+            [self.object],
+            Prefetch('team_members', queryset=Member.objects.only('name', 'role', 'photo', 'order')),
+        )
+        return super().get_context_data(**kwargs)
+    
+    def get_related_queryset(self):
+        return Project.objects.filter(
+            segment=self.object.segment_id
+        ).exclude(id=self.object.id).only('title', 'description', 'image', 'created_at')[:3]
 
 
 # Resources Views
-class ResourceListView(ListView):
+class ResourceListView(ConditionalListMixin, CursorPaginationMixin, ListView):
     """List all resources"""
     model = Resource
     template_name = 'core/resources.html'
     context_object_name = 'resources'
     paginate_by = 20
+    validator_models = (Resource,)  # bumped when download counts are flushed
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -368,15 +466,16 @@ def resource_download(request, pk):
     resource = get_object_or_404(Resource, pk=pk)
     
     if resource.file:
-        # Increment download count
-        Resource.objects.filter(pk=pk).update(downloads=resource.downloads + 1)
-        
-        response = HttpResponse(resource.file.read())
-        response['Content-Disposition'] = f'attachment; filename="{resource.file.name}"'
+        response = file_download_response(request, resource.file, resource.updated_at)
+        if is_new_download(request, response):
+            # Count the download (not HEADs, 304s or resumed range requests);
+            # the buffered counter is flushed to the database in batches
+            record_download(pk)
         return response
     elif resource.external_url:
-        # Increment download count for external links too
-        Resource.objects.filter(pk=pk).update(downloads=resource.downloads + 1)
+        # Count downloads of external links too
+        if request.method != 'HEAD':
+            record_download(pk)
         return redirect(resource.external_url)
     else:
         raise Http404("Resource file not found")
@@ -433,48 +532,7 @@ def search_view(request):
     if form.is_valid():
         query = form.cleaned_data['query']
         category = form.cleaned_data['category'] or 'all'
-        
-        if category == 'all' or category == 'members':
-            results['members'] = Member.objects.filter(
-                Q(name__icontains=query) |
-                Q(role__icontains=query) |
-                Q(bio__icontains=query)
-            )[:10]
-        
-        if category == 'all' or category == 'events':
-            results['events'] = Event.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query)
-            )[:10]
-        
-        if category == 'all' or category == 'achievements':
-            results['achievements'] = Achievement.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query)
-            )[:10]
-        
-        if category == 'all' or category == 'blog':
-            results['blog_posts'] = BlogPost.objects.filter(
-                status='published'
-            ).filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(tags__icontains=query)
-            )[:10]
-        
-        if category == 'all' or category == 'projects':
-            results['projects'] = Project.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(technologies__icontains=query)
-            )[:10]
-        
-        if category == 'all' or category == 'resources':
-            results['resources'] = Resource.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(tags__icontains=query)
-            )[:10]
+        results = search.search(query, category)
     
     # Count total results
     total_results = sum(len(result_list) for result_list in results.values())
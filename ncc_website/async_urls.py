@@ -0,0 +1,17 @@
+"""
+Root URL configuration serving the async public views.
+
+Identical to ``ncc_website.urls`` except that the ``core`` URLs come from
+``core.async_urls``. Select it with ``ROOT_URLCONF=ncc_website.async_urls``
+when running under an ASGI server.
+"""
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+
+# The first pattern of ncc_website.urls includes core.urls
+urlpatterns = [
+    path('', include('core.async_urls')),
+    *sync_urlpatterns[1:],
+]
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from decouple import config
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,17 +49,20 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.middleware.cache.UpdateCacheMiddleware',  # For caching
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.staticfiles.StaticFilesMiddleware',  # Collected static files, with security headers but nothing else
+    'core.middleware.QueryCountMiddleware',  # Per-view SQL query profiling
+    'core.routers.ReplicaRoutingMiddleware',  # Public reads may use the replica
+    'django.middleware.http.ConditionalGetMiddleware',  # 304s for page-cache hits too
+    'core.sessions.LazySessionMiddleware',  # Saves sessions only when needed
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',  # For caching
 ]
 
-ROOT_URLCONF = 'ncc_website.urls'
+# 'ncc_website.async_urls' serves the async public views (for ASGI deployments)
+ROOT_URLCONF = config('ROOT_URLCONF', default='ncc_website.urls')
 
 TEMPLATES = [
     {
@@ -82,11 +86,72 @@ WSGI_APPLICATION = 'ncc_website.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+DB_ENGINE = config('DB_ENGINE', default='sqlite3')  # or 'postgresql'
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='ncc_website'),
+            'USER': config('DB_USER', default=''),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default=''),
+            'PORT': config('DB_PORT', default=''),
+            'OPTIONS': {},
+        }
     }
+    # psycopg 3 connection pool (needs psycopg[pool]); replaces CONN_MAX_AGE
+    if config('DB_POOL', default=False, cast=bool):
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock up front instead of failing to upgrade a read lock
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Keep connections open between requests (seconds; 0 closes them after each
+# request). Pooled connections are managed by the pool instead.
+DATABASES['default']['CONN_MAX_AGE'] = (
+    0 if 'pool' in DATABASES['default']['OPTIONS']
+    else config('DB_CONN_MAX_AGE', default=60, cast=int)
+)
+# Check a reused connection still works before the request uses it
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Optional read replica (another database file for SQLite, or a replica host).
+# core.routers sends public page reads to it; writes and the admin use default.
+DATABASE_REPLICA_NAME = config('DATABASE_REPLICA_NAME', default='')
+if DATABASE_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DATABASE_REPLICA_NAME,
+        'HOST': config('DATABASE_REPLICA_HOST', default=DATABASES['default'].get('HOST', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# After writing, a visitor reads from the primary for this many seconds
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+# Applied to every new SQLite connection by core.db.configure_sqlite_connection
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),  # milliseconds
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024, cast=int),  # bytes
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-32000, cast=int),  # negative: KiB
+    'temp_store': config('SQLITE_TEMP_STORE', default='MEMORY'),
 }
 
 
@@ -129,11 +194,49 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Content-hashed names, a manifest and .gz/.br siblings (core.staticfiles)
+    'staticfiles': {'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+# Serve STATIC_ROOT from Django itself (core.staticfiles.StaticFilesMiddleware)
+STATIC_SERVE = config('STATIC_SERVE', default=not DEBUG, cast=bool)
+# Cache lifetime of static files without a content hash in their name, in seconds
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
 
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Derivatives generated for uploaded images (core.images)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 960, 1280)  # srcset widths, in pixels
+IMAGE_DERIVATIVE_FORMATS = ('avif', 'webp')  # plus a JPEG/PNG fallback; skipped if Pillow lacks them
+IMAGE_THUMBNAIL_SIZES = {
+    'admin': (120, 120),
+    'card': (480, 360),
+}
+IMAGE_QUALITY = config('IMAGE_QUALITY', default=75, cast=int)
+# Processes used to decode and resize batches of images (0 = one per CPU)
+IMAGE_PROCESS_WORKERS = config('IMAGE_PROCESS_WORKERS', default=0, cast=int)
+
+# Bulk gallery uploads (core.bulk_upload): larger images, in or out of a ZIP, are skipped
+GALLERY_UPLOAD_MAX_FILE_SIZE = config('GALLERY_UPLOAD_MAX_FILE_SIZE', default=25 * 1024 * 1024, cast=int)
+# Django's default of 100 files per request is too low for an event album
+DATA_UPLOAD_MAX_NUMBER_FILES = config('DATA_UPLOAD_MAX_NUMBER_FILES', default=1000, cast=int)
+
+# Background tasks (core.tasks), run by 'manage.py run_worker'
+TASK_ALWAYS_EAGER = config('TASK_ALWAYS_EAGER', default=False, cast=bool)  # run inline, no worker
+TASK_RETRY_DELAY = config('TASK_RETRY_DELAY', default=30, cast=int)  # seconds, doubled per attempt
+TASK_TIMEOUT = config('TASK_TIMEOUT', default=60 * 10, cast=int)  # running tasks silent for this long are retried
+
+# Resource downloads: 'stream' (served by Django), 'x-accel' (nginx) or 'x-sendfile' (Apache)
+RESOURCE_DOWNLOAD_MODE = config('RESOURCE_DOWNLOAD_MODE', default='stream')
+# Internal nginx location aliased to MEDIA_ROOT, used by the 'x-accel' mode
+RESOURCE_X_ACCEL_PREFIX = config('RESOURCE_X_ACCEL_PREFIX', default='/protected-media/')
+# Buffered download counts are written to the database this often (0 = only via
+# 'manage.py flush_download_counts')
+DOWNLOAD_COUNTER_FLUSH_SECONDS = config('DOWNLOAD_COUNTER_FLUSH_SECONDS', default=10, cast=int)
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -144,21 +247,74 @@ LOGIN_REDIRECT_URL = '/admin/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
 
 # Caching Configuration
-CACHES = {
-    'default': {
+# CACHE_BACKEND selects one of the profiles below. 'tiered' (the default) keeps a
+# per-process LRU in front of a shared file store and never touches the database;
+# set CACHE_LOCATION to a tmpfs path such as /dev/shm/ncc-cache to keep it in RAM.
+CACHE_BACKEND = config('CACHE_BACKEND', default='tiered')
+CACHE_LOCATION = config('CACHE_LOCATION', default=str(BASE_DIR / 'cache'))
+CACHE_PROFILES = {
+    'tiered': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int),
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=500, cast=int),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=5, cast=int),
+        },
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ncc-cache',
+    },
+    'database': {
         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
         'LOCATION': 'cache_table',
-    }
+    },
+}
+# Buffered download counts (core.counters) get their own cache that never culls
+# entries: an evicted counter would lose downloads. It holds a few keys per resource.
+COUNTER_CACHE_PROFILES = {
+    'tiered': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': os.path.join(CACHE_LOCATION, 'counters'),
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize, 'LOCAL_MAX_ENTRIES': 0},
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ncc-counters',
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+    },
+    'database': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'counter_cache_table',
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+    },
+}
+CACHES = {
+    'default': CACHE_PROFILES[CACHE_BACKEND],
+    'counters': COUNTER_CACHE_PROFILES[CACHE_BACKEND],
 }
 
 # Cache time-to-live (in seconds)
-CACHE_MIDDLEWARE_ALIAS = 'default'
-CACHE_MIDDLEWARE_SECONDS = 60 * 15  # 15 minutes
-CACHE_MIDDLEWARE_KEY_PREFIX = ''
+# Default lifetime of pages cached under a CachePolicy (core/urls.py), in seconds.
+# Saves and deletes purge affected pages by surrogate key, so this can be long.
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+# s-maxage sent to shared caches (CDNs, proxies), which purges do not reach, in seconds
+PAGE_SHARED_CACHE_MAX_AGE = config('PAGE_SHARED_CACHE_MAX_AGE', default=60, cast=int)
+
+# Admin dashboard counters are cached (and auto-refreshed) this often, in seconds
+DASHBOARD_STATS_TIMEOUT = config('DASHBOARD_STATS_TIMEOUT', default=30, cast=int)
+
+# How often (in seconds) each process re-checks the shared homepage snapshot version
+HOME_SNAPSHOT_CHECK_SECONDS = config('HOME_SNAPSHOT_CHECK_SECONDS', default=5, cast=int)
 
 # Session Configuration
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
-SESSION_SAVE_EVERY_REQUEST = True
+# Sessions are saved when modified; LazySessionMiddleware refreshes the expiry
+# of sessions that are only read at most this often (in seconds)
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_TOUCH_SECONDS = config('SESSION_TOUCH_SECONDS', default=60 * 5, cast=int)
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = not DEBUG
 
@@ -21,8 +21,9 @@ sitemaps = {
 }
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # core first: its admin/dashboard/ pages would otherwise hit the admin's catch-all 404
     path('', include('core.urls')),
+    path('admin/', admin.site.urls),
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', include('core.urls')),
 ]